@@ -4,7 +4,9 @@ import panel as pn, holoviews as hv
 pn.extension('tabulator')
 hv.extension('bokeh')
 
-from src.preprocess import load_combustibles
+from src.store import get_store
+from src.selection import Selection
+from src.live import start_live
 from src.visuals.panorama import panorama_view, date_range_stream, series_selector, freq_selector, epoch_toggle
 from src.visuals.estacionalidad import estacionalidad_view
 from src.visuals.barras import barras_apiladas_view
@@ -15,7 +17,9 @@ from src.visuals.anomalias import anomalias_view, ANOMALY_STATE
 from src.visuals.desempeno import desempeno_view, MODELS_STATE
 
 
-df = load_combustibles()
+store = get_store()   # dataset + derivados compartidos por todas las sesiones
+df = store.df
+start_live(store)     # modo live si COMBUSTIBLES_WATCH_DIR está definido
 
 header = pn.pane.Markdown("## Dashboard — Combustibles Guatemala (LSTM)")
 
@@ -27,15 +31,18 @@ w_epoch  = epoch_toggle()
 # Widgets en la barra lateral
 widgets = pn.Column(w_series, w_dates)
 
+# Selección única (series + rango) compartida por todas las vistas
+sel = Selection(store, w_series, w_dates)
+
 # Vistas 
-panorama = panorama_view(df, w_series, w_dates, w_freq, w_epoch)  # V1
-estacionalidad = estacionalidad_view(df, w_series, w_dates)       # V2
-barras   = barras_apiladas_view(df, w_series, w_dates)            # V3
-caja_violin = caja_violin_view(df, w_series, w_dates)             # V4
-anomalias = anomalias_view(df, w_series, w_dates)                 # V5
-real_predicho = real_predicho_view(df, w_series, w_dates)         # V6
-desempeno = desempeno_view(df, w_series, w_dates)                 # V7
-tabla    = metrics_table_view(df, w_series, w_dates)              # V8
+panorama = panorama_view(sel, w_freq, w_epoch)   # V1
+estacionalidad = estacionalidad_view(sel)        # V2
+barras   = barras_apiladas_view(sel)             # V3
+caja_violin = caja_violin_view(sel)              # V4
+anomalias = anomalias_view(sel)                  # V5
+real_predicho = real_predicho_view(sel)          # V6
+desempeno = desempeno_view(sel)                  # V7
+tabla    = metrics_table_view(sel)               # V8
 
 template = pn.template.MaterialTemplate(
     title="Panel — Visualización Interactiva",
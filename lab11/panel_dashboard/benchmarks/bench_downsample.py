@@ -0,0 +1,45 @@
+# benchmarks/bench_downsample.py
+"""
+Reducción de puntos (LTTB / min-max) para series largas.
+
+    cd lab11/panel_dashboard && python -m benchmarks.bench_downsample [--points 500000] [--series 3]
+
+Genera series tipo paseo aleatorio con frecuencia horaria y reporta, por
+método, filas enviadas al navegador, KB de la ColumnDataSource y tiempo de
+servidor para la vista general y para un zoom al 1% del rango.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from src.downsample import POINTS_PER_PIXEL, downsample_view
+
+def _kb(frame: pd.DataFrame) -> float:
+    return sum(frame[c].to_numpy().nbytes for c in frame.columns) / 1024
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=500_000)
+    ap.add_argument("--series", type=int, default=3)
+    ap.add_argument("--width", type=int, default=1000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"fecha": pd.date_range("1990-01-01", periods=args.points, freq="h")})
+    for i in range(args.series):
+        frame[f"serie_{i}"] = np.cumsum(rng.standard_normal(args.points))
+    n = POINTS_PER_PIXEL * args.width
+    z0, z1 = frame["fecha"].iloc[args.points // 2], frame["fecha"].iloc[args.points // 2 + args.points // 100]
+
+    print(f"{'método':<8}{'vista':<10}{'filas':>10}{'KB':>12}{'ms':>10}")
+    print(f"{'(todo)':<8}{'general':<10}{len(frame):>10}{_kb(frame):>12.1f}{0:>10.1f}")
+    for method in ("lttb", "minmax"):
+        for label, rng_x in (("general", (None, None)), ("zoom 1%", (z0, z1))):
+            t0 = time.perf_counter()
+            out = downsample_view(frame, n, *rng_x, method=method)
+            ms = 1e3 * (time.perf_counter() - t0)
+            print(f"{method:<8}{label:<10}{len(out):>10}{_kb(out):>12.1f}{ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
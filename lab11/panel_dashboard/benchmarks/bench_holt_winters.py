@@ -0,0 +1,63 @@
+# benchmarks/bench_holt_winters.py
+"""
+Holt-Winters: statsmodels (una serie a la vez) vs motor NumPy en lote.
+
+    cd lab11/panel_dashboard && python -m benchmarks.bench_holt_winters [--copies 10]
+
+Reporta el RMSE in-sample de cada serie con ambos motores y el tiempo total.
+Con --copies N se replica el set de series N veces (ruido leve) para ver
+cómo escala cada motor con el número de series.
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+
+from src.preprocess import load_combustibles
+from src.models import HAS_SM, fit_holt_winters
+from src.hw_numpy import fit_holt_winters_batch
+
+def _rmse(y, f):
+    ok = ~np.isnan(y) & ~np.isnan(f)
+    return float(np.sqrt(np.mean((y[ok] - f[ok]) ** 2)))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--copies", type=int, default=1)
+    ap.add_argument("--m", type=int, default=12)
+    args = ap.parse_args()
+
+    df = load_combustibles()
+    rng = np.random.default_rng(0)
+    base = df.to_numpy(dtype="float64").T
+    Y = np.concatenate([base * (1 + 0.01 * rng.standard_normal(base.shape)) if i else base
+                        for i in range(args.copies)])
+    names = [f"{c}#{i}" for i in range(args.copies) for c in df.columns]
+    print(f"{Y.shape[0]} series x {Y.shape[1]} meses")
+
+    t0 = time.perf_counter()
+    batch = fit_holt_winters_batch(Y, args.m)
+    t_np = time.perf_counter() - t0
+
+    t_sm, sm_rmse = float("nan"), {}
+    if HAS_SM:
+        t0 = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for name, y in zip(names, Y):
+                ok = ~np.isnan(y)
+                f = np.full_like(y, np.nan)
+                f[ok] = fit_holt_winters(y[ok], args.m)["fitted"]
+                sm_rmse[name] = _rmse(y, f)
+        t_sm = time.perf_counter() - t0
+
+    print(f"{'serie':<18}{'RMSE statsmodels':>18}{'RMSE NumPy':>14}{'ratio':>8}")
+    for i, name in enumerate(names[:len(df.columns)]):
+        r_np = _rmse(Y[i], batch["fitted"][i])
+        r_sm = sm_rmse.get(name, float("nan"))
+        print(f"{name:<18}{r_sm:>18,.0f}{r_np:>14,.0f}{r_np / r_sm:>8.3f}")
+    print(f"\ntiempo statsmodels: {t_sm:8.3f} s")
+    print(f"tiempo NumPy lote:  {t_np:8.3f} s  (x{t_sm / t_np:.1f})")
+
+if __name__ == "__main__":
+    main()
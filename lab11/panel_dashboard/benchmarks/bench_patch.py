@@ -0,0 +1,110 @@
+# benchmarks/bench_patch.py
+"""
+Tamaño de los mensajes PATCH-DOC (lo que viaja por el websocket) y latencia
+del lado servidor para interacciones típicas del dashboard.
+
+    cd lab11/panel_dashboard && python -m benchmarks.bench_patch [--reps 5]
+
+Monta todas las vistas de app.py en un Document de Bokeh, aplica cambios de
+rango (soltar el slider) y de series, y por cada interacción serializa los
+eventos del documento como lo haría el server: bytes enviados, nº de modelos
+Bokeh nuevos y tiempo hasta que el documento queda estable.
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+import warnings
+
+os.environ.setdefault("FIT_WORKERS", "0")
+os.environ.setdefault("FIT_CACHE_DIR", "")
+
+import pandas as pd
+import param
+from panel.io.state import set_curdoc, state
+from bokeh.document import Document
+from bokeh.document.events import DocumentPatchedEvent, ModelChangedEvent
+from bokeh.protocol import Protocol
+
+VIEWS = ["panorama", "estacionalidad", "barras", "caja_violin", "anomalias", "real_predicho", "desempeno", "tabla"]
+
+def _patch_stats(events) -> tuple[int, int]:
+    """
+    Bytes del mensaje PATCH-DOC (json + buffers binarios) y nº de modelos
+    Bokeh nuevos que el navegador tiene que crear.
+    """
+    if not events:
+        return 0, 0
+    msg = Protocol().create("PATCH-DOC", events)
+    size = len(msg.header_json) + len(msg.metadata_json) + len(msg.content_json)
+    size += sum(len(b.to_bytes()) for b in msg.buffers)
+    return size, msg.content_json.count('"type":"object"')
+
+async def _settle(doc=None):
+    # Deja correr las vistas async (real_predicho) hasta que no haya tareas pendientes
+    for _ in range(200):
+        await asyncio.sleep(0)
+        if len(asyncio.all_tasks()) <= 1:
+            break
+    # El server libera el hold de Panel en el siguiente tick; aquí se hace a mano
+    if doc is not None and doc.callbacks.hold_value:
+        doc.unhold()
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reps", type=int, default=5)
+    args = ap.parse_args()
+
+    warnings.filterwarnings("ignore")
+    # Emula una sesión: hilo principal del server, documento "conectado"
+    # (sin esto Panel descarta los eventos) y app.py ejecutado con su curdoc
+    state._thread_id = threading.get_ident()
+    doc = Document()
+    state._connected[doc] = True
+    ns = {"__name__": "bench"}
+    with open("app.py") as f, set_curdoc(doc):
+        exec(compile(f.read(), "app.py", "exec"), ns)
+        for name in VIEWS:
+            doc.add_root(ns[name].get_root(doc))
+    await _settle(doc)
+    doc.models.flush_synced()   # el documento inicial ya está en el navegador
+
+    events = []
+    doc.on_change(lambda e: events.append(e))
+    w_series, w_dates = ns["w_series"], ns["w_dates"]
+    lo, hi = w_dates.start, w_dates.end
+
+    def set_range(a, b):
+        with param.edit_constant(w_dates):
+            w_dates.value = w_dates.value_throttled = (pd.Timestamp(a), pd.Timestamp(b))
+
+    scenarios = {
+        "rango": lambda i: set_range(pd.Timestamp(lo) + pd.DateOffset(months=12 * (i % 5)), hi),
+        "series": lambda i: setattr(w_series, "value", list(w_series.options[: 1 + i % 3])),
+    }
+    with set_curdoc(doc):
+        w_series.value = list(w_series.options[:3])
+    await _settle(doc)
+    doc.models.flush_synced()
+
+    print(f"{'interacción':<12}{'KB/mensaje':>12}{'modelos nuevos':>16}{'ms servidor':>14}")
+    for label, action in scenarios.items():
+        sizes, models, times = [], [], []
+        for i in range(1, args.reps + 1):
+            events.clear()
+            t0 = time.perf_counter()
+            with set_curdoc(doc):
+                action(i)
+            await _settle(doc)
+            times.append(time.perf_counter() - t0)
+            evs = [e for e in events if isinstance(e, DocumentPatchedEvent)
+                   and not (isinstance(e, ModelChangedEvent) and e.attr == "loading")]
+            size, n_models = _patch_stats(evs)
+            sizes.append(size)
+            models.append(n_models)
+        print(f"{label:<12}{sum(sizes) / len(sizes) / 1024:>12.1f}{sum(models) / len(models):>16.0f}"
+              f"{1e3 * sum(times) / len(times):>14.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,275 @@
+# benchmarks/check_lstm_parity.py
+"""
+Paridad numérica del kernel NumPy del dashboard (src/lstm_numpy.py).
+
+    cd lab11/panel_dashboard && python -m benchmarks.check_lstm_parity [--epochs 3] [--units2 32]
+
+1) Sin TensorFlow (siempre), contra un LSTM de referencia paso a paso por
+   muestra en float64:
+   a) fixture fijo (benchmarks/fixtures/lstm_reference.npz): pesos de dos
+      capas con horizonte 2, series cortas con ceros y huecos, y las salidas
+      esperadas ya guardadas. No depende del CSV ni de los pesos exportados;
+      se regenera con --write-fixture solo si cambia el layout del .npz.
+   b) sobre store.df, la misma entrada que usa el dashboard (con los meses
+      en cero): NumpyLSTM.fitted y rolling_forecast (en lote) contra la
+      referencia, que aplica por su cuenta el preprocesamiento del
+      entrenamiento (global_lstm.mask_zeros) y descarta las ventanas con
+      NaN. Usa los pesos de COMBUSTIBLES_LSTM_NPZ si existen; si no, pesos
+      aleatorios.
+2) Con TensorFlow: entrena brevemente el LSTM global de lab2, lo exporta a
+   .npz y compara model.predict contra NumpyLSTM.forward y el pronóstico
+   recursivo a 12 meses. Sin TensorFlow esta parte se reporta como OMITIDA
+   (o falla con --require-keras).
+
+Cada check_* es importable y lanza AssertionError si la diferencia supera
+la tolerancia; el script sale con código 1 en ese caso.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "lab2" / "src"))
+
+from global_lstm import mask_zeros
+from src.lstm_numpy import LSTM_NPZ, NumpyLSTM
+from src.preprocess import load_combustibles
+
+# ---------- referencia por muestra (sin lotes ni trucos de strides) ----------
+def _ref_step(lstm: NumpyLSTM, window: np.ndarray, sid: int) -> np.ndarray:
+    """Una ventana escalada (window,) de la serie `sid` -> (horizon,) escalado."""
+    seq = [np.concatenate([[v], np.eye(len(lstm.series))[sid]]) for v in window]
+    for k, (W, U, b) in enumerate(lstm.layers):
+        units = U.shape[0]
+        h, c, outs = np.zeros(units), np.zeros(units), []
+        for x in seq:
+            z = x @ W + h @ U + b
+            i = 1 / (1 + np.exp(-z[:units]))
+            f = 1 / (1 + np.exp(-z[units:2 * units]))
+            g = np.tanh(z[2 * units:3 * units])
+            o = 1 / (1 + np.exp(-z[3 * units:]))
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            outs.append(h)
+        seq = outs
+    return seq[-1] @ lstm.dense_kernel + lstm.dense_bias
+
+def _random_npz(path: Path, series: list, df, units: int = 16, window: int = 12) -> None:
+    """Pesos aleatorios con el layout de export_npz (escalado del tramo válido de cada serie)."""
+    rng = np.random.default_rng(0)
+    nf = 1 + len(series)
+    masked = mask_zeros(df[series])
+    lo, hi = masked.min().to_numpy(), masked.max().to_numpy()
+    np.savez(path, n_lstm=np.int64(1), window=np.int64(window), horizon=np.int64(1),
+             lstm0_kernel=rng.normal(0, 0.3, (nf, 4 * units)).astype("float32"),
+             lstm0_recurrent=rng.normal(0, 0.3, (units, 4 * units)).astype("float32"),
+             lstm0_bias=np.zeros(4 * units, dtype="float32"),
+             dense_kernel=rng.normal(0, 0.3, (units, 1)).astype("float32"),
+             dense_bias=np.zeros(1, dtype="float32"),
+             series=np.array(series), scale_min=lo, scale_scale=np.where(hi > lo, hi - lo, 1.0),
+             zero_as_nan=np.bool_(True))
+
+def _reference(lstm: NumpyLSTM, df, steps: int, every: int = 1) -> tuple:
+    """
+    Ajuste a 1 paso (T x serie) y pronóstico recursivo (serie x T x steps)
+    con la referencia por muestra; NaN en ventanas u objetivos inválidos.
+    El recursivo solo se calcula en los orígenes t con (t - window + 1) % every == 0
+    (`origins`, T x serie).
+    """
+    cols = [c for c in df.columns if c in lstm.series]
+    V = mask_zeros(df[cols]).to_numpy(dtype="float64")
+    w, T = lstm.window, len(df)
+    fit = np.full((T, len(cols)), np.nan)
+    roll = np.full((len(cols), T, steps), np.nan)
+    origins = np.zeros((T, len(cols)), dtype=bool)
+    for k, c in enumerate(cols):
+        sid = lstm.series.index(c)
+        lo, sc = lstm.scale_min[sid], lstm.scale_scale[sid]
+        y = (V[:, k] - lo) / sc
+        for t in range(w, T):
+            win = y[t - w:t]
+            if not np.isnan(win).any() and not np.isnan(y[t]):
+                fit[t, k] = _ref_step(lstm, win, sid)[0] * sc + lo
+        # La referencia es lenta: con store.df se toma un subconjunto de orígenes
+        for t in range(w - 1, T, every):
+            origins[t, k] = True
+            win = y[t + 1 - w:t + 1]
+            if np.isnan(win).any():
+                continue
+            win, ref = list(win), []
+            while len(ref) < steps:
+                p = _ref_step(lstm, np.array(win[-w:]), sid)
+                ref.extend(p[:steps - len(ref)])
+                win.extend(p)
+            roll[k, t] = np.array(ref) * sc + lo
+    return cols, fit, roll, origins
+
+def _compare(lstm: NumpyLSTM, df, fit_ref, roll_ref, origins, tol: float, label: str) -> None:
+    """Kernel en lote vs referencia: mismo patrón de NaN y |Δ| relativo <= tol."""
+    steps = roll_ref.shape[-1]
+    cols = [c for c in df.columns if c in lstm.series]
+    got_fit = lstm.fitted(df)[cols].to_numpy()
+    got_roll = lstm.rolling_forecast(df, steps)[[df.columns.get_loc(c) for c in cols]]
+    got_roll = got_roll[origins.T]
+    roll_ref = roll_ref[origins.T]
+
+    def rel(got, ref):
+        ok = ~np.isnan(ref)
+        return float(np.max(np.abs(got[ok] - ref[ok]) / np.maximum(np.abs(ref[ok]), 1.0), initial=0.0))
+
+    err_fit, err_roll = rel(got_fit, fit_ref), rel(got_roll, roll_ref)
+    bad_nan = int((np.isnan(got_fit) != np.isnan(fit_ref)).sum()
+                  + (np.isnan(got_roll) != np.isnan(roll_ref)).any(axis=-1).sum())
+    n_fit, n_roll = int((~np.isnan(fit_ref)).sum()), int((~np.isnan(roll_ref)).all(axis=-1).sum())
+    print(f"kernel vs referencia por muestra ({label})")
+    print(f"  fitted 1 paso     {n_fit} ventanas   max |Δ| relativo: {err_fit:.2e}")
+    print(f"  rolling {steps} meses  {n_roll} orígenes   max |Δ| relativo: {err_roll:.2e}")
+    print(f"  ventanas con NaN distinto de la referencia: {bad_nan}")
+    assert n_fit > 0 and n_roll > 0, f"{label}: sin ventanas válidas que comparar"
+    assert bad_nan == 0, f"{label}: {bad_nan} predicciones con NaN distinto de la referencia"
+    assert err_fit <= tol, f"{label}: fitted difiere {err_fit:.2e} > {tol}"
+    assert err_roll <= tol, f"{label}: rolling difiere {err_roll:.2e} > {tol}"
+
+# ---------- fixture fijo (pesos, entradas y salidas esperadas) ----------
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "lstm_reference.npz"
+_FIXTURE_STEPS = 6
+
+def write_fixture(path: Path = FIXTURE) -> None:
+    """
+    Regenera el fixture: 2 capas LSTM + Dense con horizonte 2 y pesos
+    aleatorios fijos, series cortas con ceros y NaN, y las salidas de la
+    referencia por muestra. Solo hace falta si cambia el layout del .npz.
+    """
+    rng = np.random.default_rng(7)
+    series, window, units = ["A", "B", "C"], 6, (5, 3)
+    fechas = pd.date_range("2000-01-01", periods=40, freq="MS", name="fecha")
+    Y = 100 + np.cumsum(rng.normal(0, 5, (40, 3)), axis=0)
+    Y[10, 0] = 0.0          # mes en cero: zero_as_nan lo enmascara
+    Y[25:27, 1] = np.nan    # hueco
+    Y[:8, 2] = np.nan       # serie que empieza tarde
+    df = pd.DataFrame(Y, index=fechas, columns=series)
+    masked = mask_zeros(df)
+    lo, hi = masked.min().to_numpy(), masked.max().to_numpy()
+    nf, weights = 1 + len(series), {}
+    for i, u in enumerate(units):
+        weights[f"lstm{i}_kernel"] = rng.normal(0, 0.4, (nf, 4 * u)).astype("float32")
+        weights[f"lstm{i}_recurrent"] = rng.normal(0, 0.4, (u, 4 * u)).astype("float32")
+        weights[f"lstm{i}_bias"] = rng.normal(0, 0.1, 4 * u).astype("float32")
+        nf = u
+    weights.update(dense_kernel=rng.normal(0, 0.4, (units[-1], 2)).astype("float32"),
+                   dense_bias=rng.normal(0, 0.1, 2).astype("float32"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    layout = dict(n_lstm=np.int64(len(units)), window=np.int64(window), horizon=np.int64(2),
+                  series=np.array(series), scale_min=lo, scale_scale=np.where(hi > lo, hi - lo, 1.0),
+                  zero_as_nan=np.bool_(True), **weights)
+    np.savez(path, **layout)
+    _, fit, roll, _ = _reference(NumpyLSTM(path), df, _FIXTURE_STEPS)
+    np.savez(path, **layout, ref_fechas=fechas.values, ref_values=Y, ref_fitted=fit, ref_rolling=roll)
+
+def check_fixture(tol: float, path: Path = FIXTURE) -> None:
+    """Kernel contra las salidas guardadas en el fixture: no depende de TensorFlow ni del CSV."""
+    lstm = NumpyLSTM(path)
+    with np.load(path, allow_pickle=False) as z:
+        df = pd.DataFrame(z["ref_values"], index=pd.DatetimeIndex(z["ref_fechas"], name="fecha"),
+                          columns=lstm.series)
+        fit_ref, roll_ref = z["ref_fitted"], z["ref_rolling"]
+    origins = np.zeros((len(df), len(lstm.series)), dtype=bool)
+    origins[lstm.window - 1:] = True
+    _compare(lstm, df, fit_ref, roll_ref, origins, tol, f"fixture {path.name}")
+
+def check_kernel(tol: float, every: int = 7) -> None:
+    """Kernel contra la referencia sobre store.df, con los pesos exportados o aleatorios."""
+    df = load_combustibles()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = LSTM_NPZ
+        if not Path(path).exists():
+            path = Path(tmp) / "lstm_rand.npz"
+            _random_npz(path, list(df.columns), df)
+        lstm = NumpyLSTM(path)
+    _, fit_ref, roll_ref, origins = _reference(lstm, df, 12, every)
+    label = f"store.df, {'pesos exportados' if Path(LSTM_NPZ).exists() else 'pesos aleatorios'}"
+    _compare(lstm, df, fit_ref, roll_ref, origins, tol, label)
+
+# ---------- Keras ----------
+def _keras_recursive(model, data, df, steps: int) -> np.ndarray:
+    """Pronóstico recursivo con Keras, paso a paso (referencia del kernel NumPy)."""
+    from global_lstm import with_series_ids
+    ids = np.arange(len(data.series))
+    win = np.stack([data.scaler.transform(df.to_numpy())[:, i][~np.isnan(df.iloc[:, i].to_numpy())][-data.window:]
+                    for i in ids]).astype("float32")
+    out = []
+    for _ in range(steps):
+        p = model.predict(with_series_ids(win[..., None], ids, len(ids)), verbose=0)[:, :1]
+        out.append(p[:, 0])
+        win = np.concatenate([win[:, 1:], p], axis=1)
+    return data.scaler.inverse(np.stack(out, axis=1), ids)
+
+def check_keras(args) -> bool:
+    """Keras vs kernel; False si se omitió por falta de TensorFlow (error con --require-keras)."""
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        assert not args.require_keras, "Keras vs kernel: TensorFlow no está instalado (--require-keras)"
+        print("Keras vs kernel: OMITIDA (TensorFlow no está instalado)")
+        return False
+    from global_lstm import GlobalWindows, build_model, export_npz, load_series
+
+    df = load_series()
+    data = GlobalWindows(df, window=12)
+    model = build_model(data.window, data.n_features, units=args.units, units2=args.units2,
+                        dropout=0.2 if args.units2 else 0.0)
+    model.fit(data.tf_dataset(data.train_idx, 512), epochs=args.epochs, verbose=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "lstm.npz"
+        export_npz(model, data, path)
+        kb = path.stat().st_size / 1024
+        lstm = NumpyLSTM(path)
+
+    X, _, _ = data.take(data.test_idx)
+    t0 = time.perf_counter(); ref = model.predict(X, batch_size=4096, verbose=0); t_keras = time.perf_counter() - t0
+    t0 = time.perf_counter(); got = lstm.forward(X); t_np = time.perf_counter() - t0
+    err_1 = float(np.abs(got - ref).max())
+
+    ref_fc = _keras_recursive(model, data, df, 12)
+    fc = lstm.forecast(df, 12)
+    pos = [data.series.index(c) for c in fc.columns]
+    got_fc = fc.to_numpy().T
+    err_fc = float(np.nanmax(np.abs(got_fc - ref_fc[pos]) / np.maximum(np.abs(ref_fc[pos]), 1.0)))
+
+    print(f"Keras vs kernel — npz: {kb:.1f} KB  ventanas test: {len(X)}")
+    print(f"  forward 1 paso   max |Δ| (escalado): {err_1:.2e}   keras {1e3 * t_keras:.1f} ms  numpy {1e3 * t_np:.1f} ms")
+    print(f"  recursivo 12 m   max |Δ| relativo:   {err_fc:.2e}")
+    assert err_1 <= args.tol, f"Keras vs kernel: forward difiere {err_1:.2e} > {args.tol}"
+    assert err_fc <= args.tol, f"Keras vs kernel: recursivo difiere {err_fc:.2e} > {args.tol}"
+    return True
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--epochs", type=int, default=3)
+    ap.add_argument("--units", type=int, default=64)
+    ap.add_argument("--units2", type=int, default=0)
+    ap.add_argument("--tol", type=float, default=1e-4)
+    ap.add_argument("--require-keras", action="store_true", help="falla si TensorFlow no está instalado")
+    ap.add_argument("--write-fixture", action="store_true", help=f"regenera {FIXTURE.name} y sale")
+    args = ap.parse_args(argv)
+    if args.write_fixture:
+        write_fixture()
+        print(f"fixture escrito en {FIXTURE}")
+        return 0
+
+    try:
+        check_fixture(args.tol)
+        check_kernel(args.tol)
+        check_keras(args)
+    except AssertionError as e:
+        print(f"FALLA: {e}")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
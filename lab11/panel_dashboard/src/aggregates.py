@@ -0,0 +1,59 @@
+# src/aggregates.py
+import numpy as np
+import pandas as pd
+
+class PeriodPrefixSums:
+    """
+    Sumas acumuladas por fila de todas las series + límites de cada periodo
+    (Año o Trimestre), para responder "suma por periodo dentro de [i0, i1)"
+    con dos restas de arrays, sin melt/groupby/pivot.
+
+    - keys:   clave entera y ordenada de cada periodo (año, o año*4 + trimestre-1)
+    - starts: fila donde empieza cada periodo (+ len(df) al final)
+    - csum:   (n_filas + 1) x n_series, con NaN tratados como 0 (como groupby.sum)
+    """
+
+    def __init__(self, df: pd.DataFrame, freq: str):
+        fechas = df.index
+        if freq == "Año":
+            row_key = fechas.year.to_numpy(dtype=np.int64)
+        else:
+            row_key = fechas.year.to_numpy(dtype=np.int64) * 4 + (fechas.quarter.to_numpy(dtype=np.int64) - 1)
+        self.freq = freq
+        self.columns = list(df.columns)
+        self._col_pos = {c: i for i, c in enumerate(self.columns)}
+        self.row_key = row_key
+        # El índice está ordenado, así que cada periodo es un bloque contiguo
+        new = np.r_[True, row_key[1:] != row_key[:-1]]
+        self.keys = row_key[new]
+        self.starts = np.r_[np.flatnonzero(new), len(row_key)]
+        values = np.nan_to_num(df.to_numpy(dtype="float64"), nan=0.0)
+        csum = np.zeros((len(df) + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=csum[1:])
+        self.csum = csum
+        for arr in (self.row_key, self.keys, self.starts, self.csum):
+            arr.flags.writeable = False
+
+    def labels(self, keys: np.ndarray) -> list[str]:
+        if self.freq == "Año":
+            return [str(k) for k in keys]
+        return [f"{k // 4}Q{k % 4 + 1}" for k in keys]
+
+    def range_sums(self, i0: int, i1: int, series) -> tuple[np.ndarray, np.ndarray]:
+        """(claves de periodo, sumas periodo x serie) para las filas [i0, i1)."""
+        cols = [self._col_pos[s] for s in series]
+        if i1 <= i0:
+            return self.keys[:0], np.zeros((0, len(cols)))
+        p0 = int(np.searchsorted(self.keys, self.row_key[i0]))
+        p1 = int(np.searchsorted(self.keys, self.row_key[i1 - 1])) + 1
+        # Límites de periodo recortados al rango: los extremos pueden ser parciales
+        b = np.clip(self.starts[p0:p1 + 1], i0, i1)
+        sums = self.csum[b[1:]][:, cols] - self.csum[b[:-1]][:, cols]
+        return self.keys[p0:p1], sums
+
+    def range_table(self, i0: int, i1: int, series) -> pd.DataFrame:
+        """Tabla ancha lista para graficar: columna 'Periodo' + una columna por serie."""
+        keys, sums = self.range_sums(i0, i1, series)
+        out = pd.DataFrame(sums, columns=list(series))
+        out.insert(0, "Periodo", self.labels(keys))
+        return out
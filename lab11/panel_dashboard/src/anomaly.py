@@ -0,0 +1,100 @@
+# src/anomaly.py
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def rolling_zscores(values: np.ndarray, window: int) -> dict:
+    """
+    Media/desviación móviles (ddof=0) y z-score de TODAS las series a la vez.
+    values: (n_fechas x n_series). Ventanas incompletas o con NaN -> NaN.
+    Usa una vista deslizante (sin copiar) de forma (n - w + 1, n_series, w).
+    """
+    values = np.asarray(values, dtype="float64")
+    T, S = values.shape
+    mu = np.full((T, S), np.nan)
+    sd = np.full((T, S), np.nan)
+    if T >= window:
+        win = sliding_window_view(values, window, axis=0)
+        mu[window - 1:] = win.mean(axis=-1)
+        sd[window - 1:] = win.std(axis=-1)
+    resid = values - mu
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = resid / sd
+    out = {"valor": values, "media": mu, "std": sd, "resid": resid, "z": z}
+    for arr in out.values():
+        arr.flags.writeable = False
+    return out
+
+def zscore_engine(store, window: int) -> dict:
+    """z-scores de todo el histórico, cacheados en el store por (ventana, versión de datos)."""
+    return store.cached(("zscores", window), lambda: rolling_zscores(store.df.to_numpy(dtype="float64"), window))
+
+class StreamingZScorer:
+    """
+    z-score incremental O(1) por dato nuevo, para meses que llegan por append.
+
+    Por cada (serie, ventana) guarda los últimos `w` valores en un anillo y la
+    media/M2 de la ventana (Welford deslizante): al entrar x_new y salir x_old
+
+        mean' = mean + (x_new - x_old) / w
+        M2'   = M2 + (x_new - x_old) * (x_new - mean' + x_old - mean)
+
+    El z de y_t usa la ventana que incluye y_t (igual que rolling_zscores).
+    Los NaN no actualizan el estado.
+    """
+
+    def __init__(self, series, windows=(3, 6, 12)):
+        self.series = list(series)
+        self.windows = tuple(windows)
+        S = len(self.series)
+        self._pos = {s: i for i, s in enumerate(self.series)}
+        self._ring = {w: np.zeros((S, w)) for w in self.windows}
+        self._count = {w: np.zeros(S, dtype=np.int64) for w in self.windows}
+        self._mean = {w: np.zeros(S) for w in self.windows}
+        self._m2 = {w: np.zeros(S) for w in self.windows}
+        self.last_fecha = None
+
+    @classmethod
+    def from_history(cls, df, windows=(3, 6, 12)) -> "StreamingZScorer":
+        """Arranca con el estado al final del histórico (solo mira las últimas max(w) filas válidas)."""
+        scorer = cls(df.columns, windows)
+        tail = max(scorer.windows)
+        for s in scorer.series:
+            vals = df[s].dropna().to_numpy(dtype="float64")[-tail:]
+            for v in vals:
+                scorer._push_one(scorer._pos[s], v)
+        scorer.last_fecha = df.index[-1] if len(df) else None
+        return scorer
+
+    def _push_one(self, i: int, x: float) -> dict:
+        out = {}
+        for w in self.windows:
+            n = self._count[w][i]
+            ring, mean, m2 = self._ring[w], self._mean[w], self._m2[w]
+            if n < w:
+                # Welford clásico mientras la ventana se llena
+                delta = x - mean[i]
+                mean[i] += delta / (n + 1)
+                m2[i] += delta * (x - mean[i])
+            else:
+                old = ring[i, n % w]
+                m_old = mean[i]
+                mean[i] = m_old + (x - old) / w
+                m2[i] += (x - old) * (x - mean[i] + old - m_old)
+            ring[i, n % w] = x
+            self._count[w][i] = n + 1
+            if n + 1 >= w:
+                sd = np.sqrt(max(m2[i], 0.0) / w)
+                out[w] = (x - mean[i]) / sd if sd > 0 else np.nan
+            else:
+                out[w] = np.nan
+        return out
+
+    def push(self, fecha, row) -> dict:
+        """Incorpora una fila {serie: valor} y devuelve {serie: {ventana: z}}."""
+        out = {}
+        for s, x in row.items():
+            if s not in self._pos or x is None or np.isnan(x):
+                continue
+            out[s] = self._push_one(self._pos[s], float(x))
+        self.last_fecha = fecha
+        return out
@@ -0,0 +1,164 @@
+# src/artifacts.py
+"""
+Artefacto de pronósticos precalculados, por versión de datos.
+
+Lo escribe el comando batch src/build_artifacts.py; el dashboard lo abre
+con mmap al crear el store y las vistas pesadas pasan a ser lookups:
+
+- backtest (Naive, S-Naive(12), Holt-Winters y LSTM si hay pesos): lo
+  devuelve get_backtest sin recalcular; la última fila de orígenes es el
+  pronóstico h = 1..12 desde el último dato.
+- valores ajustados in-sample de toda la historia (Naive, S-Naive(12),
+  Holt-Winters, Holt-Winters (NumPy), LSTM).
+- sumas de error del backtest por modelo x serie x horizonte: la tabla de
+  métricas de la historia completa (vista 8) sale de ellas sin tocar el
+  tensor de pronósticos.
+
+Layout columnar (como la caché de load_combustibles), en
+.cache/artifacts/<versión>/ o COMBUSTIBLES_ARTIFACTS=/ruta:
+
+    fechas.npy    (T,)
+    fitted.npy    (modelo ajustado x serie x T)
+    actual.npy    (serie x origen x horizonte)
+    forecast.npy  (modelo x serie x origen x horizonte)
+    sums.npy      (modelo x serie x horizonte x SUMS), ver metrics.error_sums
+    meta.json     versión, nombres, parámetros; se escribe al final
+
+Si la versión de los datos cambia (CSV nuevo, append del modo live) no hay
+artefacto para ella y todo se ajusta en vivo como antes.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.lstm_numpy import LSTM_NPZ
+from src.metrics import metrics_from_sums
+
+ARTIFACTS_DIR = Path(os.environ.get("COMBUSTIBLES_ARTIFACTS",
+                                    Path(__file__).resolve().parents[1] / ".cache" / "artifacts"))
+
+# Versión del formato en disco; súbela si cambia el layout o cómo se calcula
+# algún arreglo (2: el LSTM enmascara los meses en cero como el entrenamiento;
+# 3: sumas de error en lugar de métricas ya reducidas por horizonte)
+_FORMAT = 3
+SUMS = ["n", "abs", "sq", "n_pct", "ape"]
+_ARRAYS = ("fechas", "fitted", "actual", "forecast", "sums")
+
+def lstm_signature(path: Path = LSTM_NPZ) -> dict | None:
+    """mtime/tamaño de los pesos LSTM: si cambian, las partes LSTM del artefacto no valen."""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def write_artifact(version: str, arrays: dict, meta: dict, root: Path = ARTIFACTS_DIR) -> Path:
+    """Escribe los .npy + meta.json de forma atómica (tmp + replace) y devuelve la carpeta."""
+    out = Path(root) / version
+    out.mkdir(parents=True, exist_ok=True)
+    for name in _ARRAYS:
+        tmp = out / f".{name}.npy.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(arrays[name]))
+        os.replace(tmp, out / f"{name}.npy")
+    # meta.json va al final: es lo que da por válido el artefacto
+    meta = {"format": _FORMAT, "version": version, **meta}
+    tmp = out / f".meta.json.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, out / "meta.json")
+    return out
+
+class ForecastArtifact:
+    """Artefacto abierto con mmap (solo lectura); nada se copia hasta que se rebana."""
+
+    def __init__(self, path: Path, meta: dict, stamp: int = 0):
+        self.path = Path(path)
+        self.stamp = stamp          # mtime de meta.json: identifica esta construcción
+        self.version = meta["version"]
+        self.series = list(meta["series"])
+        arr = {name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        self.fechas = pd.DatetimeIndex(np.asarray(arr["fechas"]), name="fecha")
+        self.horizons = np.arange(1, arr["actual"].shape[-1] + 1)
+        fitted_models, models = list(meta["fitted_models"]), list(meta["models"])
+        self.fitted_params = meta["fitted_params"]
+        # LSTM va siempre al final: si los pesos cambiaron, se recorta con una vista
+        if meta.get("lstm") != lstm_signature():
+            fitted_models = [m for m in fitted_models if m != "LSTM"]
+            models = [m for m in models if m != "LSTM"]
+        self.fitted_models, self.models = fitted_models, models
+        self._fitted = arr["fitted"][:len(fitted_models)]
+        self._sums = arr["sums"][:len(models)]
+        self.backtest = {
+            "series": self.series,
+            "models": models,
+            "origins": self.fechas,
+            "horizons": self.horizons,
+            "actual": arr["actual"],
+            "forecast": arr["forecast"][:len(models)],
+            "params": {m: {k: np.asarray(v) for k, v in p.items()} for m, p in meta["backtest_params"].items()},
+        }
+
+    def fitted(self, model: str) -> pd.DataFrame | None:
+        """Ajuste in-sample de toda la historia (fechas x series), o None si el modelo no está."""
+        if model not in self.fitted_models:
+            return None
+        values = self._fitted[self.fitted_models.index(model)].T
+        return pd.DataFrame(values, index=self.fechas, columns=self.series, copy=False)
+
+    def metrics_table(self, series) -> pd.DataFrame:
+        """
+        MAE/RMSE/MAPE por serie y modelo sobre toda la historia (todos los
+        orígenes y horizontes): el mismo resultado que
+        metrics.backtest_metrics_table sin rango, a partir de las sumas.
+        """
+        sel = [s for s in series if s in self.series]
+        idx = [self.series.index(s) for s in sel]
+        sums = np.asarray(self._sums[:, idx]).sum(axis=2)              # (modelo x serie x SUMS)
+        res = metrics_from_sums({k: sums[..., i] for i, k in enumerate(SUMS)})
+        rows = []
+        for k, s in enumerate(sel):
+            for j, m in enumerate(self.models):
+                if np.isnan(res["MAE"][j, k]):
+                    continue
+                rows.append(dict(Serie=s, Modelo=m, MAE=res["MAE"][j, k],
+                                 RMSE=res["RMSE"][j, k], MAPE=res["MAPE"][j, k]))
+        return pd.DataFrame(rows, columns=["Serie", "Modelo", "MAE", "RMSE", "MAPE"])
+
+# (raíz, versión) -> artefacto abierto. Solo se guardan cargas exitosas: si el
+# batch corre con el server arriba, el siguiente llamado lo encuentra.
+_LOADED: dict[tuple[str, str], ForecastArtifact] = {}
+_LOCK = threading.Lock()
+
+def load_artifact(version: str, root: str = str(ARTIFACTS_DIR)) -> ForecastArtifact | None:
+    """
+    Artefacto de `version` abierto con mmap, o None si no existe o no es de
+    esta versión. Cada llamado hace un stat de meta.json: si el artefacto se
+    reconstruyó (otro mtime), se vuelve a abrir.
+    """
+    path = Path(root) / version
+    try:
+        stamp = (path / "meta.json").stat().st_mtime_ns
+    except OSError:
+        return None
+    key = (str(root), version)
+    with _LOCK:
+        art = _LOADED.get(key)
+        if art is not None and art.stamp == stamp:
+            return art
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != _FORMAT or meta.get("version") != version:
+        return None
+    try:
+        art = ForecastArtifact(path, meta, stamp)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[artifacts] Artefacto inválido en {path}: {e}")
+        return None
+    with _LOCK:
+        _LOADED[key] = art
+    return art
@@ -0,0 +1,173 @@
+# src/backtest.py
+"""
+Backtesting con origen móvil (rolling origin) para Naive, S-Naive(12) y
+Holt-Winters, todas las series y horizontes h = 1..H a la vez.
+
+Para cada origen t (último dato observado) y horizonte h se guarda el
+pronóstico de y_{t+h} en tensores (serie x origen x horizonte):
+
+- Naive:        y_t
+- S-Naive(12):  y_{t+h-12k}, k = ceil(h/12)
+- Holt-Winters: l_t + h b_t + s_{t+h-mk}. Los parámetros se ajustan una vez
+  con la historia previa al primer origen y luego un único filtrado sobre
+  toda la serie da el estado (l, b, s) en cada origen: no hay reajustes.
+
+Los resultados se cachean por versión de datos. Con muchas series, los
+bloques de series se reparten en un pool de procesos. Si hay un artefacto
+precalculado de la versión (src/artifacts.py), se usa tal cual: incluye
+además el LSTM.
+"""
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.artifacts import load_artifact
+from src.hw_numpy import fit_holt_winters_batch, holt_winters_states
+from src.metrics import batched_metrics
+
+MODELS = ["Naive", "S-Naive(12)", "Holt-Winters"]
+HORIZON = 12
+MIN_TRAIN = 36        # meses de historia mínimos antes del primer origen
+SEASON = 12
+_CHUNK = 32           # series por tarea del pool
+
+# Modelo de la UI -> modelo del backtest (el Holt-Winters del backtest usa el motor NumPy)
+BACKTEST_MODEL = {
+    "Naive": "Naive",
+    "S-Naive(12)": "S-Naive(12)",
+    "Holt-Winters": "Holt-Winters",
+    "Holt-Winters (NumPy)": "Holt-Winters",
+    "LSTM": "LSTM",      # solo en el backtest del artefacto precalculado
+}
+
+# LRU de resultados por (versión, parámetros) -> Future. El modo live crea una
+# versión por append: solo se guardan las más recientes, no un tensor por tick.
+# Cabe la versión vigente y la anterior con varias combinaciones de parámetros.
+_MAX_RESULTS = 8
+_RESULTS: OrderedDict = OrderedDict()
+_LOCK = threading.Lock()     # solo protege el dict; el cálculo corre fuera
+
+def _targets(Y: np.ndarray, horizon: int) -> np.ndarray:
+    """actual[s, t, h-1] = y_{t+h} como vista deslizante (sin copiar Y)."""
+    S, T = Y.shape
+    pad = np.concatenate([Y, np.full((S, horizon), np.nan)], axis=1)
+    return sliding_window_view(pad, horizon + 1, axis=1)[:, :T, 1:]
+
+def _seasonal_lag(horizon: int, m: int) -> np.ndarray:
+    """Desfase hacia atrás desde t del último dato de la misma fase estacional."""
+    h = np.arange(1, horizon + 1)
+    return m * np.ceil(h / m).astype(int) - h
+
+def _backtest_block(Y: np.ndarray, horizon: int, min_train: int, m: int) -> dict:
+    """Pronósticos (modelo x serie x origen x horizonte) para un bloque de series."""
+    S, T = Y.shape
+    t = np.arange(T)[None, :, None]
+    lag = _seasonal_lag(horizon, m)[None, None, :]
+    rows = np.arange(S)[:, None, None]
+    h = np.arange(1, horizon + 1)[None, None, :]
+
+    valid = ~np.isnan(Y)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), T)
+    # Origen válido: con al menos `min_train` meses de historia desde el primer dato
+    is_origin = np.arange(T)[None, :] >= (first + min_train - 1)[:, None]
+
+    fc = np.full((len(MODELS), S, T, horizon), np.nan)
+    fc[0] = np.broadcast_to(Y[:, :, None], (S, T, horizon))
+    src = t - lag
+    fc[1] = np.where(src >= 0, Y[rows, np.clip(src, 0, T - 1)], np.nan)
+
+    # Holt-Winters: ajuste con la historia de entrenamiento, estados en cada t
+    train = np.where(np.arange(T)[None, :] < (first + min_train)[:, None], Y, np.nan)
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        fit = fit_holt_winters_batch(train, m)
+        L, B, Ssn = holt_winters_states(Y, fit)
+    season = Ssn[rows, np.clip(src, 0, T - 1)]
+    fc[2] = L[:, :, None] + h * B[:, :, None] + season
+
+    fc[:, ~is_origin] = np.nan
+    return {"forecast": fc, "params": {k: fit[k] for k in ("alpha", "beta", "gamma")}}
+
+def run_backtest(df: pd.DataFrame, horizon: int = HORIZON, min_train: int = MIN_TRAIN,
+                 m: int = SEASON, n_jobs: int | None = None) -> dict:
+    """
+    Backtest de todas las columnas de df (índice = fechas). Devuelve:
+      series, models, origins (DatetimeIndex), horizons,
+      actual (serie x origen x horizonte), forecast (modelo x serie x origen x horizonte),
+      params {modelo: {alpha, beta, gamma}} de Holt-Winters.
+    """
+    Y = df.to_numpy(dtype="float64").T
+    S = Y.shape[0]
+    chunks = [slice(i, i + _CHUNK) for i in range(0, S, _CHUNK)]
+    n_jobs = n_jobs or min(len(chunks), os.cpu_count() or 1)
+    if n_jobs > 1 and len(chunks) > 1:
+        # spawn: el backtest corre dentro del server; un fork copiaría sus hilos
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn")) as pool:
+            parts = list(pool.map(_backtest_block, [Y[c] for c in chunks],
+                                  [horizon] * len(chunks), [min_train] * len(chunks), [m] * len(chunks)))
+    else:
+        parts = [_backtest_block(Y[c], horizon, min_train, m) for c in chunks]
+
+    forecast = np.concatenate([p["forecast"] for p in parts], axis=1)
+    hw_params = {k: np.concatenate([p["params"][k] for p in parts]) for k in ("alpha", "beta", "gamma")}
+    actual = _targets(Y, horizon)
+    forecast.flags.writeable = False
+    return {
+        "series": list(df.columns),
+        "models": list(MODELS),
+        "origins": df.index,
+        "horizons": np.arange(1, horizon + 1),
+        "actual": actual,
+        "forecast": forecast,
+        "params": {"Holt-Winters": hw_params},
+    }
+
+def get_backtest(store, **kwargs) -> dict:
+    """
+    Backtest del store, calculado una vez por versión de datos (y parámetros).
+    Con los parámetros por defecto y un artefacto de la versión, es un lookup.
+    """
+    # El artefacto se consulta antes que la caché: uno construido con el server
+    # arriba reemplaza al backtest en vivo de la misma versión
+    art = None if kwargs else load_artifact(store.version)
+    if art is not None:
+        return art.backtest
+    key = (store.version, tuple(sorted(kwargs.items())))
+    with _LOCK:
+        fut = _RESULTS.get(key)
+        owner = fut is None
+        if owner:
+            fut = _RESULTS[key] = Future()
+            while len(_RESULTS) > _MAX_RESULTS:
+                _RESULTS.popitem(last=False)
+        _RESULTS.move_to_end(key)
+    if owner:
+        # Quien crea la entrada calcula; las demás sesiones con la misma clave esperan su Future
+        try:
+            fut.set_result(run_backtest(store.df, **kwargs))
+        except BaseException as e:
+            with _LOCK:
+                if _RESULTS.get(key) is fut:
+                    del _RESULTS[key]
+            fut.set_exception(e)
+            raise
+    return fut.result()
+
+def horizon_errors(bt: dict, model: str, series, i0: int = 0, i1: int | None = None) -> np.ndarray:
+    """Errores pronóstico - real (serie x origen x horizonte) para orígenes en [i0, i1)."""
+    j = bt["models"].index(BACKTEST_MODEL.get(model, model))
+    idx = [bt["series"].index(s) for s in series if s in bt["series"]]
+    return bt["forecast"][j, idx, i0:i1] - bt["actual"][idx, i0:i1]
+
+def horizon_curves(bt: dict, model: str, series, i0: int = 0, i1: int | None = None) -> pd.DataFrame:
+    """RMSE y MAE por horizonte h = 1..H sobre todas las series y orígenes, en una reducción."""
+    j = bt["models"].index(BACKTEST_MODEL.get(model, model))
+    idx = [bt["series"].index(s) for s in series if s in bt["series"]]
+    res = batched_metrics(bt["actual"][idx, i0:i1], bt["forecast"][j, idx, i0:i1], axis=(0, 1))
+    return pd.DataFrame({"h": bt["horizons"], "RMSE": res["RMSE"], "MAE": res["MAE"], "Modelo": model})
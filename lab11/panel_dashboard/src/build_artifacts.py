@@ -0,0 +1,125 @@
+# src/build_artifacts.py
+"""
+Comando batch (offline) que precalcula el artefacto de pronósticos de la
+versión actual de los datos (formato en src/artifacts.py):
+
+    cd lab11/panel_dashboard && python -m src.build_artifacts [--workers 4]
+
+Con los mismos ajustes que usan las vistas: Holt-Winters de statsmodels
+por serie (si está instalado), el motor NumPy en un solo lote, el backtest
+de src/backtest.py (con sus sumas de error para la tabla de métricas) y,
+si hay pesos exportados, el LSTM con el kernel NumPy.
+Hay que volver a correrlo cuando cambie el CSV o se reexporten los pesos.
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.artifacts import ARTIFACTS_DIR, SUMS, lstm_signature, write_artifact
+from src.backtest import HORIZON, SEASON, run_backtest
+from src.hw_numpy import fit_holt_winters_batch
+from src.lstm_numpy import load_lstm
+from src.metrics import error_sums
+from src.models import HAS_SM, fit_holt_winters
+from src.preprocess import combustibles_version, load_combustibles
+
+def _fitted_all(df: pd.DataFrame, m: int = SEASON) -> tuple[dict, dict]:
+    """
+    Ajustes in-sample de toda la historia, {modelo: (serie x T)} y sus
+    parámetros {modelo: [dict | None por serie]} (los de Holt-Winters
+    siembran la caché de ajustes de real_predicho).
+    """
+    Y = df.to_numpy(dtype="float64").T
+    S, T = Y.shape
+    naive, snaive = np.full((S, T), np.nan), np.full((S, T), np.nan)
+    for i, s in enumerate(df.columns):
+        # Igual que la vista: rezago sobre la serie sin NaN
+        ser = df[s].dropna()
+        naive[i] = ser.shift(1).reindex(df.index).to_numpy()
+        snaive[i] = ser.shift(m).reindex(df.index).to_numpy()
+    fitted = {"Naive": naive, "S-Naive(12)": snaive}
+    params = {"Naive": [None] * S, "S-Naive(12)": [None] * S}
+
+    if HAS_SM:
+        hw, hw_params = np.full((S, T), np.nan), [None] * S
+        for i, s in enumerate(df.columns):
+            ser = df[s].dropna()
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    fit = fit_holt_winters(ser.to_numpy(), m)
+            except Exception as e:
+                print(f"[build_artifacts] Holt-Winters {s}: {e}")
+                continue
+            hw[i, df.index.get_indexer(ser.index)] = fit["fitted"]
+            hw_params[i] = fit["params"]
+        fitted["Holt-Winters"], params["Holt-Winters"] = hw, hw_params
+
+    # Motor NumPy: mismas series que ajusta la vista (al menos dos temporadas)
+    ok = (~np.isnan(Y)).sum(axis=1) >= 2 * m
+    hwnp, np_params = np.full((S, T), np.nan), [None] * S
+    if ok.any():
+        with np.errstate(all="ignore"):
+            res = fit_holt_winters_batch(Y[ok], m)
+        for k, i in enumerate(np.flatnonzero(ok)):
+            hwnp[i] = res["fitted"][k]
+            p = {key: float(res[key][k]) for key in ("alpha", "beta", "gamma", "sse", "level0", "trend0")}
+            p["season0"] = res["season0"][k].tolist()
+            np_params[i] = p
+    fitted["Holt-Winters (NumPy)"], params["Holt-Winters (NumPy)"] = hwnp, np_params
+    return fitted, params
+
+def build(workers: int | None = None, root=ARTIFACTS_DIR):
+    df = load_combustibles()
+    version = combustibles_version()
+    lstm = load_lstm()
+
+    t0 = time.perf_counter()
+    bt = run_backtest(df, n_jobs=workers)
+    forecast = np.asarray(bt["forecast"])
+    models = list(bt["models"])
+    fitted, params = _fitted_all(df)
+    if lstm is not None:
+        fitted["LSTM"] = lstm.fitted(df).to_numpy(dtype="float64").T
+        params["LSTM"] = [None] * len(df.columns)
+        # Mismos orígenes que el resto del backtest (Naive es NaN fuera de ellos)
+        lstm_fc = lstm.rolling_forecast(df, HORIZON)
+        lstm_fc[np.isnan(forecast[0])] = np.nan
+        forecast = np.concatenate([forecast, lstm_fc[None]])
+        models.append("LSTM")
+
+    res = error_sums(bt["actual"], forecast, axis=-2)                # (modelo x serie x horizonte)
+    sums = np.stack([res[k] for k in SUMS], axis=-1).astype("float64")
+    fitted_models = list(fitted)
+    arrays = {
+        "fechas": df.index.values,
+        "fitted": np.stack([fitted[mdl] for mdl in fitted_models]),
+        "actual": bt["actual"],
+        "forecast": forecast,
+        "sums": sums,
+    }
+    meta = {
+        "series": list(df.columns),
+        "models": models,
+        "fitted_models": fitted_models,
+        "fitted_params": {mdl: params[mdl] for mdl in fitted_models},
+        "backtest_params": {mdl: {k: np.asarray(v).tolist() for k, v in p.items()}
+                            for mdl, p in bt["params"].items()},
+        "lstm": lstm_signature() if lstm is not None else None,
+    }
+    out = write_artifact(version, arrays, meta, root)
+    print(f"[build_artifacts] versión {version}: {len(df.columns)} series; backtest {', '.join(models)}; "
+          f"ajustes {', '.join(fitted_models)} ({time.perf_counter() - t0:.1f} s) -> {out}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Precalcula ajustes, pronósticos y métricas del dashboard")
+    ap.add_argument("--workers", type=int, default=None, help="procesos del backtest (default: núcleos)")
+    ap.add_argument("--out", default=str(ARTIFACTS_DIR), help="carpeta raíz de los artefactos")
+    args = ap.parse_args()
+    build(args.workers, args.out)
+
+if __name__ == "__main__":
+    main()
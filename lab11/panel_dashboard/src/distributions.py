@@ -0,0 +1,123 @@
+# src/distributions.py
+"""
+Resúmenes de distribución por mes (1..12) para Caja/Violín.
+
+En lugar de mandar cada observación al navegador (hvplot.box/violin, con
+KDE en cada cambio), se calculan aquí, vectorizados sobre una matriz
+mes x observación rellena con NaN:
+
+- caja:     cuartiles, bigotes (1.5·IQR recortado a los datos) y n
+- atipico:  observaciones fuera de los bigotes
+- kde:      densidad gaussiana (ancho de banda de Scott) sobre una malla fija
+
+El resultado es un frame largo con columna `capa`; la vista solo dibuja
+glyphs de resumen a partir de él.
+
+`residual_distribution` hace lo mismo para los residuales de desempeño:
+histograma y KDE en densidad sobre el mismo eje, la KDE vía FFT (binning
+lineal + convolución) cuando hay muchas muestras.
+"""
+import warnings
+import numpy as np
+import pandas as pd
+
+KDE_POINTS = 100
+KDE_CUT = 3.0      # la curva se extiende KDE_CUT anchos de banda más allá de los datos
+
+def _by_month(values: np.ndarray, months: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(meses con datos, matriz mes x observación rellena con NaN)."""
+    ok = ~np.isnan(values)
+    values, months = values[ok], months[ok].astype(np.int64)
+    order = np.argsort(months, kind="stable")
+    values, months = values[order], months[order]
+    present, starts, counts = np.unique(months, return_index=True, return_counts=True)
+    M = np.full((len(present), counts.max() if len(counts) else 0), np.nan)
+    g = np.repeat(np.arange(len(present)), counts)
+    M[g, np.arange(len(values)) - starts[g]] = values
+    return present, M
+
+def _box(M: np.ndarray) -> dict:
+    q1, q2, q3 = np.nanquantile(M, [0.25, 0.5, 0.75], axis=1)
+    iqr = q3 - q1
+    inside = (M >= (q1 - 1.5 * iqr)[:, None]) & (M <= (q3 + 1.5 * iqr)[:, None])
+    lo = np.nanmin(np.where(inside, M, np.nan), axis=1)
+    hi = np.nanmax(np.where(inside, M, np.nan), axis=1)
+    return {"q1": q1, "q2": q2, "q3": q3, "lo": lo, "hi": hi, "n": (~np.isnan(M)).sum(axis=1)}
+
+def _kde(M: np.ndarray, n: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(malla, densidad mes x malla, máscara de la cola recortada por mes)."""
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # meses con un solo dato
+        std = np.nanstd(M, axis=1, ddof=1)
+        bw = std * n ** -0.2
+    # Meses constantes o con un solo dato: ancho mínimo para que se vean
+    scale = np.nanmax(np.abs(M)) if M.size else 1.0
+    bw = np.where(np.isfinite(bw) & (bw > 0), bw, max(scale, 1.0) * 1e-3)
+    vmin, vmax = np.nanmin(M, axis=1), np.nanmax(M, axis=1)
+    grid = np.linspace((vmin - KDE_CUT * bw).min(), (vmax + KDE_CUT * bw).max(), KDE_POINTS)
+    z = (grid[None, None, :] - M[:, :, None]) / bw[:, None, None]
+    dens = np.nansum(np.exp(-0.5 * z * z), axis=1) / (n * bw * np.sqrt(2 * np.pi))[:, None]
+    keep = (grid[None, :] >= (vmin - KDE_CUT * bw)[:, None]) & (grid[None, :] <= (vmax + KDE_CUT * bw)[:, None])
+    return grid, dens, keep
+
+def month_distribution(values: np.ndarray, months: np.ndarray) -> pd.DataFrame:
+    """
+    Frame largo (capa, Mes, q1, q2, q3, lo, hi, n, valor, densidad) con las
+    estadísticas de caja, los atípicos y la KDE por mes de una serie.
+    """
+    present, M = _by_month(np.asarray(values, dtype="float64"), np.asarray(months))
+    if not len(present):
+        return pd.DataFrame(columns=["capa", "Mes", "q1", "q2", "q3", "lo", "hi", "n", "valor", "densidad"])
+
+    box = _box(M)
+    caja = pd.DataFrame({"capa": "caja", "Mes": present, **box})
+
+    out = (M < box["lo"][:, None]) | (M > box["hi"][:, None])
+    g, _ = np.nonzero(out)
+    atipico = pd.DataFrame({"capa": "atipico", "Mes": present[g], "valor": M[out]})
+
+    grid, dens, keep = _kde(M, box["n"])
+    g, j = np.nonzero(keep)
+    kde = pd.DataFrame({"capa": "kde", "Mes": present[g], "valor": grid[j], "densidad": dens[g, j]})
+
+    return pd.concat([caja, atipico, kde], ignore_index=True)
+
+RESID_BINS = 40
+RESID_GRID = 256
+FFT_KDE_MIN = 5000   # desde aquí la KDE se evalúa por FFT en lugar de suma directa
+
+def _kde_fft(x: np.ndarray, grid: np.ndarray, bw: float) -> np.ndarray:
+    """KDE gaussiana en una malla uniforme: binning lineal + convolución por FFT."""
+    G, dx = len(grid), grid[1] - grid[0]
+    pos = (x - grid[0]) / dx
+    i = np.clip(np.floor(pos).astype(np.int64), 0, G - 2)
+    frac = pos - i
+    w = np.bincount(i, 1.0 - frac, minlength=G) + np.bincount(i + 1, frac, minlength=G)
+    off = np.arange(-(G - 1), G) * dx
+    kernel = np.exp(-0.5 * (off / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+    n = 1 << int(np.ceil(np.log2(3 * G - 2)))
+    conv = np.fft.irfft(np.fft.rfft(w, n) * np.fft.rfft(kernel, n), n)[G - 1:2 * G - 1]
+    return np.maximum(conv, 0.0) / len(x)
+
+def residual_distribution(resid: np.ndarray, bins: int = RESID_BINS, grid_points: int = RESID_GRID) -> pd.DataFrame:
+    """
+    Frame largo (capa, x, y): 'hist' con centro de bin y densidad del
+    histograma, 'kde' con la malla y la densidad gaussiana (Scott).
+    """
+    r = np.asarray(resid, dtype="float64")
+    r = r[~np.isnan(r)]
+    if not len(r):
+        return pd.DataFrame({"capa": pd.Series(dtype=object), "x": pd.Series(dtype=float), "y": pd.Series(dtype=float)})
+    counts, edges = np.histogram(r, bins=bins, density=True)
+    std = r.std(ddof=1) if len(r) > 1 else 0.0
+    bw = std * len(r) ** -0.2 if std > 0 else max(abs(r[0]), 1.0) * 1e-3
+    grid = np.linspace(r.min() - KDE_CUT * bw, r.max() + KDE_CUT * bw, grid_points)
+    if len(r) >= FFT_KDE_MIN:
+        dens = _kde_fft(r, grid, bw)
+    else:
+        z = (grid[None, :] - r[:, None]) / bw
+        dens = np.exp(-0.5 * z * z).sum(axis=0) / (len(r) * bw * np.sqrt(2 * np.pi))
+    return pd.concat([
+        pd.DataFrame({"capa": "hist", "x": (edges[:-1] + edges[1:]) / 2, "y": counts}),
+        pd.DataFrame({"capa": "kde", "x": grid, "y": dens}),
+    ], ignore_index=True)
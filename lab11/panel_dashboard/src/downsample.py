@@ -0,0 +1,103 @@
+# src/downsample.py
+"""
+Reducción de puntos del lado servidor para las gráficas de líneas.
+
+Cada serie se reduce a ~2x el ancho en píxeles de la figura con LTTB
+(Largest-Triangle-Three-Buckets) o min-max por bloques; por debajo de ese
+umbral el frame pasa intacto (mismo objeto), así que con los 300 meses
+actuales no cambia nada. Al hacer zoom se recalcula solo la ventana visible
+y se une a la vista general: el payload queda acotado a cualquier tamaño de
+datos y "reset" sigue mostrando todo el rango.
+
+    COMBUSTIBLES_DOWNSAMPLE=lttb | minmax | off   (default lttb)
+"""
+import os
+import numpy as np
+import pandas as pd
+
+METHOD = os.environ.get("COMBUSTIBLES_DOWNSAMPLE", "lttb")
+POINTS_PER_PIXEL = 2
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Posiciones de los n puntos LTTB de (x, y); x creciente y sin NaN en y."""
+    N = len(x)
+    if n >= N or n < 3:
+        return np.arange(N)
+    # n-2 bloques entre el primer y el último punto (que siempre se conservan)
+    edges = np.linspace(1, N - 1, n - 1).astype(np.int64)
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, N - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else N
+        avg_x, avg_y = x[hi:nhi].mean(), y[hi:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Posiciones del mínimo y el máximo de cada bloque (más extremos); ignora NaN."""
+    N = len(y)
+    if 2 * n_buckets >= N:
+        return np.arange(N)
+    size = -(-N // n_buckets)
+    nb = -(-N // size)
+    Y = np.full(nb * size, np.nan)
+    Y[:N] = y
+    Y = Y.reshape(nb, size)
+    nan = np.isnan(Y)
+    base = np.arange(nb) * size
+    ok = ~nan.all(axis=1)
+    lo = base + np.where(nan, np.inf, Y).argmin(axis=1)
+    hi = base + np.where(nan, -np.inf, Y).argmax(axis=1)
+    return np.unique(np.concatenate([[0, N - 1], lo[ok], hi[ok]]))
+
+def downsample_positions(frame: pd.DataFrame, n: int, x: str = "fecha", method: str = METHOD,
+                         by=None) -> np.ndarray | None:
+    """
+    Posiciones de filas a conservar (unión de lo que elige cada columna de
+    `by`, default todas, así todas comparten el eje `x`), o None si el frame
+    no necesita reducción. Con `by` solo esas columnas eligen los puntos y
+    el resto (p.ej. ajustes de modelos) reutiliza las mismas filas.
+    """
+    if method == "off" or len(frame) <= n:
+        return None
+    xs = frame[x].to_numpy(dtype="datetime64[ns]").view("int64").astype("float64")
+    keep = [np.array([0, len(frame) - 1])]
+    for c in frame.columns if by is None else by:
+        if c == x:
+            continue
+        y = frame[c].to_numpy(dtype="float64")
+        valid = np.flatnonzero(~np.isnan(y))
+        if method == "minmax":
+            keep.append(valid[minmax_indices(y[valid], n // 2)])
+        else:
+            keep.append(valid[lttb_indices(xs[valid], y[valid], n)])
+    return np.unique(np.concatenate(keep))
+
+def downsample_view(frame: pd.DataFrame, n: int, x0=None, x1=None, x: str = "fecha",
+                    method: str = METHOD, by=None) -> pd.DataFrame:
+    """
+    Vista general del frame reducida a ~n puntos por serie, más el detalle
+    (otros ~n) de la ventana [x0, x1] si hay zoom. Devuelve `frame` tal cual
+    si no hace falta reducir.
+    """
+    overview = downsample_positions(frame, n, x, method, by)
+    if overview is None:
+        return frame
+    parts = [overview]
+    if x0 is not None and x1 is not None:
+        fechas = frame[x].to_numpy(dtype="datetime64[ns]")
+        i0 = max(int(np.searchsorted(fechas, _ts(x0), side="left")) - 1, 0)
+        i1 = min(int(np.searchsorted(fechas, _ts(x1), side="right")) + 1, len(frame))
+        detail = downsample_positions(frame.iloc[i0:i1], n, x, method, by)
+        parts.append(i0 + (np.arange(i1 - i0) if detail is None else detail))
+    return frame.iloc[np.unique(np.concatenate(parts))].reset_index(drop=True)
+
+def _ts(v) -> np.datetime64:
+    # Bokeh manda los rangos de ejes datetime en ms desde epoch; HoloViews, como fechas
+    if isinstance(v, (int, float, np.number)):
+        return np.datetime64(int(v), "ms").astype("datetime64[ns]")
+    return pd.Timestamp(v).to_datetime64()
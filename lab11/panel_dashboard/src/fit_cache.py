@@ -0,0 +1,91 @@
+# src/fit_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+class FitCache:
+    """
+    Caché LRU (proceso) de modelos ajustados: guarda fitted values + parámetros.
+
+    - key: tupla hasheable, p.ej. (modelo, serie, desde, hasta, m, versión de datos)
+    - maxsize: número máximo de ajustes en memoria (se expulsa el menos usado)
+    - persist_dir: si se da, cada ajuste también se escribe como .npz y se lee
+      en un fallo de memoria, así un server reiniciado arranca "caliente".
+    """
+
+    def __init__(self, maxsize: int = 256, persist_dir: str | Path | None = None):
+        self.maxsize = maxsize
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _path(self, key) -> Path:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.persist_dir / f"{digest}.npz"
+
+    def _load(self, key) -> dict | None:
+        if self.persist_dir is None:
+            return None
+        try:
+            with np.load(self._path(key)) as z:
+                return {"fitted": z["fitted"], "params": json.loads(str(z["params"]))}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, key, value: dict) -> None:
+        if self.persist_dir is None:
+            return
+        try:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(tmp, fitted=value["fitted"], params=json.dumps(value["params"]))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[FitCache] No se pudo persistir el ajuste: {e}")
+
+    def get(self, key) -> dict | None:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+        value = self._load(key)
+        if value is not None:
+            self.put(key, value, persist=False)
+            with self._lock:
+                self.hits += 1
+        return value
+
+    def put(self, key, value: dict, persist: bool = True) -> None:
+        value["fitted"].flags.writeable = False
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if persist:
+            self._save(key, value)
+
+    def get_or_fit(self, key, fit_fn) -> dict:
+        """Devuelve el ajuste cacheado o llama a fit_fn() -> {'fitted', 'params'}."""
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = fit_fn()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
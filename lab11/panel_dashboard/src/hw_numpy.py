@@ -0,0 +1,158 @@
+# src/hw_numpy.py
+"""
+Holt-Winters aditivo (tendencia y estacionalidad aditivas) en NumPy,
+vectorizado sobre una matriz (series x tiempo).
+
+Las recursiones son las de statsmodels (sin amortiguamiento):
+
+    yhat_t = l_{t-1} + b_{t-1} + s_{t-m}
+    l_t    = a (y_t - s_{t-m}) + (1 - a)(l_{t-1} + b_{t-1})
+    b_t    = b (l_t - l_{t-1}) + (1 - b) b_{t-1}
+    s_t    = g (y_t - l_{t-1} - b_{t-1}) + (1 - g) s_{t-m}
+
+El bucle es solo sobre el tiempo; cada paso actualiza a la vez todas las
+series y todos los candidatos de parámetros (arrays series x candidatos).
+Los parámetros se eligen por búsqueda en rejilla + refinamientos locales,
+todo en lote. Un NaN en y_t no actualiza el estado ni suma al SSE.
+"""
+import numpy as np
+
+# Rejilla inicial (alpha, beta, gamma) y número de refinamientos locales
+_GRID_ALPHA = np.linspace(0.02, 0.98, 9)
+_GRID_BETA = np.array([0.0, 0.01, 0.03, 0.08, 0.15, 0.3])
+_GRID_GAMMA = np.array([0.0, 0.02, 0.05, 0.1, 0.2, 0.35, 0.5])
+_ROUNDS = 5
+
+def left_align(Y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Desplaza cada fila para que empiece en su primer dato válido (NaN al final)."""
+    Y = np.asarray(Y, dtype="float64")
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    valid = ~np.isnan(Y)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), Y.shape[1])
+    T = Y.shape[1]
+    cols = np.arange(T)[None, :] + first[:, None]
+    out = np.full_like(Y, np.nan)
+    inside = cols < T
+    out[inside] = Y[np.nonzero(inside)[0], cols[inside]]
+    return out, first
+
+def initial_states(Y: np.ndarray, m: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Inicialización heurística con las dos primeras temporadas (filas alineadas a la izquierda)."""
+    first = np.nanmean(Y[:, :m], axis=1)
+    second = np.nanmean(Y[:, m:2 * m], axis=1)
+    l0 = first
+    b0 = np.nan_to_num((second - first) / m)
+    # Estacionalidad: desvío de cada mes respecto a la tendencia lineal inicial
+    trend = l0[:, None] + b0[:, None] * (np.arange(m)[None, :] - (m - 1) / 2)
+    s0 = np.nan_to_num(Y[:, :m] - trend)
+    s0 -= s0.mean(axis=1, keepdims=True)
+    return l0, b0, s0
+
+def _filter(Y, alpha, beta, gamma, l0, b0, s0, keep_states=False):
+    """
+    Recursión en lote. Y: (S, T); alpha/beta/gamma: (S, G); l0/b0: (S,); s0: (S, m).
+    Devuelve sse (S, G), fitted (S, G, T) y, si keep_states, (L, B, Ssn) (S, G, T).
+    """
+    S, T = Y.shape
+    G = alpha.shape[1]
+    m = s0.shape[1]
+    level = np.repeat(l0[:, None], G, axis=1)
+    trend = np.repeat(b0[:, None], G, axis=1)
+    # Anillo estacional: season[..., t % m] guarda s_{t-m} al llegar a t
+    season = np.repeat(s0[:, None, :], G, axis=1).copy()
+    sse = np.zeros((S, G))
+    fitted = np.empty((S, G, T))
+    if keep_states:
+        L = np.empty((S, G, T)); B = np.empty((S, G, T)); Ssn = np.empty((S, G, T))
+    for t in range(T):
+        k = t % m
+        s_prev = season[:, :, k]
+        base = level + trend
+        yhat = base + s_prev
+        fitted[:, :, t] = yhat
+        y = Y[:, t][:, None]
+        miss = np.isnan(y)
+        y = np.where(miss, yhat, y)
+        err = y - yhat
+        sse += err * err
+        new_level = alpha * (y - s_prev) + (1 - alpha) * base
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, :, k] = gamma * (y - base) + (1 - gamma) * s_prev
+        level = new_level
+        if keep_states:
+            L[:, :, t] = level; B[:, :, t] = trend; Ssn[:, :, t] = season[:, :, k]
+    out = (sse, fitted)
+    if keep_states:
+        out += ((L, B, Ssn),)
+    return out
+
+def _grid(a, b, g):
+    A, Bt, Gm = np.meshgrid(a, b, g, indexing="ij")
+    return A.ravel(), Bt.ravel(), Gm.ravel()
+
+def fit_holt_winters_batch(Y: np.ndarray, seasonal_periods: int = 12, rounds: int = _ROUNDS) -> dict:
+    """
+    Ajusta Holt-Winters aditivo a todas las filas de Y (series x tiempo) a la vez.
+    Las filas pueden tener NaN al inicio (se alinean internamente). Devuelve:
+      fitted (S, T) alineado con Y, alpha/beta/gamma/sse (S,), level0/trend0 (S,),
+      season0 (S, m) y el desplazamiento `first` de cada fila.
+    """
+    Y = np.asarray(Y, dtype="float64")
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    m = seasonal_periods
+    Ya, first = left_align(Y)
+    S = Ya.shape[0]
+    l0, b0, s0 = initial_states(Ya, m)
+
+    # 1) Rejilla gruesa común a todas las series
+    ga, gb, gg = _grid(_GRID_ALPHA, _GRID_BETA, _GRID_GAMMA)
+    alpha = np.tile(ga, (S, 1)); beta = np.tile(gb, (S, 1)); gamma = np.tile(gg, (S, 1))
+    sse, _ = _filter(Ya, alpha, beta, gamma, l0, b0, s0)
+    best = sse.argmin(axis=1)
+    rows = np.arange(S)
+    pa, pb, pg = alpha[rows, best], beta[rows, best], gamma[rows, best]
+    best_sse = sse[rows, best]
+
+    # 2) Refinamientos locales: rejilla 3x3x3 alrededor del óptimo de cada serie
+    step = np.array([_GRID_ALPHA[1] - _GRID_ALPHA[0], 0.04, 0.05])
+    offs = np.array(_grid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1])).T  # (27, 3)
+    for _ in range(rounds):
+        step = step / 2
+        alpha = np.clip(pa[:, None] + offs[None, :, 0] * step[0], 0.0, 1.0)
+        beta = np.clip(pb[:, None] + offs[None, :, 1] * step[1], 0.0, 1.0)
+        gamma = np.clip(pg[:, None] + offs[None, :, 2] * step[2], 0.0, 1.0)
+        sse, _ = _filter(Ya, alpha, beta, gamma, l0, b0, s0)
+        best = sse.argmin(axis=1)
+        improved = sse[rows, best] < best_sse
+        pa = np.where(improved, alpha[rows, best], pa)
+        pb = np.where(improved, beta[rows, best], pb)
+        pg = np.where(improved, gamma[rows, best], pg)
+        best_sse = np.minimum(best_sse, sse[rows, best])
+
+    _, fitted = _filter(Ya, pa[:, None], pb[:, None], pg[:, None], l0, b0, s0)
+    return {
+        "fitted": realign(fitted[:, 0, :], first),
+        "alpha": pa, "beta": pb, "gamma": pg, "sse": best_sse,
+        "level0": l0, "trend0": b0, "season0": s0, "first": first,
+    }
+
+def holt_winters_states(Y: np.ndarray, fit: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Estados (nivel, tendencia, estacional) en cada t con los parámetros ya ajustados, alineados con Y."""
+    Ya, first = left_align(Y)
+    _, _, (L, B, Ssn) = _filter(
+        Ya, fit["alpha"][:, None], fit["beta"][:, None], fit["gamma"][:, None],
+        fit["level0"], fit["trend0"], fit["season0"], keep_states=True,
+    )
+    return realign(L[:, 0, :], first), realign(B[:, 0, :], first), realign(Ssn[:, 0, :], first)
+
+def realign(Xa: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Inverso de left_align: devuelve cada fila a sus posiciones originales."""
+    S, T = Xa.shape
+    out = np.full_like(Xa, np.nan)
+    cols = np.arange(T)[None, :] + first[:, None]
+    inside = cols < T
+    src = np.nonzero(inside)
+    out[src[0], cols[inside]] = Xa[src]
+    return out
@@ -0,0 +1,72 @@
+# src/live.py
+"""
+Modo live: un callback periódico revisa un directorio de entrega y agrega
+al store los meses nuevos de cada CSV (p.ej. importacion_2025_actualizado.csv).
+
+    COMBUSTIBLES_WATCH_DIR=../../lab2/data/clean panel serve app.py
+
+El watcher es único por proceso (pn.state.schedule_task). Cada archivo nuevo o
+modificado se lee con load_update_file; DataStore.append se queda solo con las
+filas posteriores al último mes y avisa a las sesiones abiertas, que extienden
+panorama y real_predicho vía streams sin redibujar. Las anomalías de los meses
+nuevos se puntúan de forma incremental.
+"""
+import os
+from pathlib import Path
+import pandas as pd
+import panel as pn
+
+from src.preprocess import load_update_file
+from src.visuals.anomalias import streaming_scorer, score_appended
+
+WATCH_DIR = os.environ.get("COMBUSTIBLES_WATCH_DIR", "")
+WATCH_PERIOD = os.environ.get("COMBUSTIBLES_WATCH_PERIOD", "30s")
+
+class LiveWatcher:
+    """Revisa `drop_dir` y agrega al store las filas nuevas de cada CSV."""
+
+    def __init__(self, store, drop_dir, pattern: str = "*.csv"):
+        self.store = store
+        self.drop_dir = Path(drop_dir)
+        self.pattern = pattern
+        self._seen = {}
+        # El scorer vive aquí: el append vacía las tablas derivadas del store
+        self.scorer = streaming_scorer(store)
+
+    def _changed(self) -> list[Path]:
+        out = []
+        for path in sorted(self.drop_dir.glob(self.pattern)):
+            try:
+                sig = (path.stat().st_mtime_ns, path.stat().st_size)
+            except OSError:
+                continue
+            if self._seen.get(path) != sig:
+                self._seen[path] = sig
+                out.append(path)
+        return out
+
+    def poll(self) -> pd.DataFrame | None:
+        """Una pasada: devuelve las filas agregadas (None si no hubo nada nuevo)."""
+        added = []
+        for path in self._changed():
+            try:
+                rows = load_update_file(path)
+            except Exception as e:
+                print(f"[live] No se pudo leer {path.name}: {e}")
+                continue
+            new = self.store.append(rows)
+            if new is not None:
+                print(f"[live] {path.name}: +{len(new)} meses ({new.index[0]:%Y-%m} a {new.index[-1]:%Y-%m})")
+                score_appended(self.scorer, new)
+                added.append(new)
+        return pd.concat(added) if added else None
+
+def start_live(store, drop_dir=None, period: str = WATCH_PERIOD) -> LiveWatcher | None:
+    """Arranca (una vez por proceso) el watcher si hay directorio configurado."""
+    drop_dir = drop_dir or WATCH_DIR
+    if not drop_dir:
+        return None
+    key = f"combustibles-live-{Path(drop_dir).resolve()}"
+    watcher = pn.state.as_cached(key, LiveWatcher, store=store, drop_dir=drop_dir)
+    pn.state.schedule_task(key, watcher.poll, period=period)
+    return watcher
@@ -0,0 +1,167 @@
+# src/lstm_numpy.py
+"""
+Inferencia del LSTM global solo con NumPy (el proceso de Panel nunca
+importa TensorFlow).
+
+Lee el .npz que exporta lab2/src/global_lstm.py (export_npz): pesos de las
+capas LSTM (compuertas i, f, c, o como en Keras) y Dense, ventana, horizonte,
+nombres de serie, su escalado min-max y el preprocesamiento del
+entrenamiento (`zero_as_nan`: los meses en cero pasan a NaN, como en
+load_series). La entrada de cada paso es el valor escalado + one-hot de la
+serie, igual que en el entrenamiento; las ventanas con NaN no se predicen.
+
+    COMBUSTIBLES_LSTM_NPZ=/ruta/lstm_global.npz panel serve app.py
+    (default: panel_dashboard/models/lstm_global.npz; sin archivo no hay modelo LSTM)
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+LSTM_NPZ = Path(os.environ.get("COMBUSTIBLES_LSTM_NPZ",
+                               Path(__file__).resolve().parents[1] / "models" / "lstm_global.npz"))
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * z) + 1.0)   # estable para |z| grande
+
+class NumpyLSTM:
+    """LSTM apilado + Dense, forward por lotes (b, window, features)."""
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as z:
+            self.layers = [(z[f"lstm{i}_kernel"], z[f"lstm{i}_recurrent"], z[f"lstm{i}_bias"])
+                           for i in range(int(z["n_lstm"]))]
+            self.dense_kernel, self.dense_bias = z["dense_kernel"], z["dense_bias"]
+            self.window, self.horizon = int(z["window"]), int(z["horizon"])
+            self.series = [str(s) for s in z["series"]]
+            self.scale_min, self.scale_scale = z["scale_min"], z["scale_scale"]
+            # Pesos exportados antes de la bandera: load_series siempre enmascaró los ceros
+            self.zero_as_nan = bool(z["zero_as_nan"]) if "zero_as_nan" in z.files else True
+        self._pos = {s: i for i, s in enumerate(self.series)}
+
+    def forward(self, X: np.ndarray) -> np.ndarray:
+        """(b, window, 1 + n_series) escalado -> (b, horizon) escalado."""
+        seq = X.astype("float32", copy=False)
+        for k, (W, U, b) in enumerate(self.layers):
+            units = U.shape[0]
+            # Proyección de la entrada para todos los pasos en un solo matmul
+            xz = seq @ W + b
+            h = np.zeros((len(seq), units), dtype="float32")
+            c = np.zeros_like(h)
+            out = np.empty((len(seq), seq.shape[1], units), dtype="float32") if k < len(self.layers) - 1 else None
+            for t in range(seq.shape[1]):
+                z = xz[:, t] + h @ U
+                i, f = _sigmoid(z[:, :units]), _sigmoid(z[:, units:2 * units])
+                g, o = np.tanh(z[:, 2 * units:3 * units]), _sigmoid(z[:, 3 * units:])
+                c = f * c + i * g
+                h = o * np.tanh(c)
+                if out is not None:
+                    out[:, t] = h
+            seq = out if out is not None else h
+        return seq @ self.dense_kernel + self.dense_bias
+
+    def _inputs(self, windows: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Ventanas escaladas (b, window) + one-hot de la serie -> (b, window, 1 + n_series)."""
+        X = np.zeros((len(ids), self.window, 1 + len(self.series)), dtype="float32")
+        X[:, :, 0] = windows
+        X[np.arange(len(ids)), :, 1 + ids] = 1.0
+        return X
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Mismo preprocesamiento que el entrenamiento (store.df conserva los ceros)."""
+        return df.where(df > 0) if self.zero_as_nan else df
+
+    def _scale(self, values: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        return (values - self.scale_min[ids, None]) / self.scale_scale[ids, None]
+
+    def _unscale(self, scaled: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        return scaled * self.scale_scale[ids, None] + self.scale_min[ids, None]
+
+    def fitted(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Predicción a 1 paso (in-sample) de cada fecha a partir de las `window`
+        anteriores, todas las series y fechas en un solo lote. NaN si la
+        ventana o el mes objetivo tienen huecos (como las ventanas de
+        entrenamiento) o la serie no está en el modelo.
+        """
+        cols = [c for c in df.columns if c in self._pos]
+        out = pd.DataFrame(np.nan, index=df.index, columns=df.columns)
+        if len(df) <= self.window or not cols:
+            return out
+        df = self._prepare(df)
+        ids = np.array([self._pos[c] for c in cols])
+        V = self._scale(df[cols].to_numpy(dtype="float64").T, ids)          # (k, T)
+        W = sliding_window_view(V[:, :-1], self.window, axis=1)              # (k, T - window, window)
+        ok = ~np.isnan(W).any(axis=2) & ~np.isnan(V[:, self.window:])
+        kk, tt = np.nonzero(ok)
+        if len(kk):
+            pred = self.forward(self._inputs(W[kk, tt], ids[kk]))[:, 0]
+            F = np.full(W.shape[:2], np.nan)
+            F[kk, tt] = pred
+            out.iloc[self.window:, [df.columns.get_loc(c) for c in cols]] = self._unscale(F, ids).T
+        return out
+
+    def forecast(self, df: pd.DataFrame, steps: int) -> pd.DataFrame:
+        """
+        Pronóstico recursivo a `steps` meses desde la última fecha, todas las
+        series a la vez: cada predicción entra a la ventana del paso siguiente.
+        Cada serie arranca de la ventana que termina en su último dato; si
+        esa ventana tiene huecos, la serie se omite (como en el entrenamiento).
+        """
+        idx = pd.date_range(df.index[-1], periods=steps + 1, freq="MS")[1:]
+        df = self._prepare(df)
+        cols, hist = [], []
+        for c in df.columns:
+            ser = df[c]
+            last = ser.last_valid_index()
+            if c not in self._pos or last is None:
+                continue
+            t = df.index.get_loc(last)
+            win = ser.to_numpy(dtype="float64")[max(t + 1 - self.window, 0):t + 1]
+            if len(win) == self.window and not np.isnan(win).any():
+                cols.append(c)
+                hist.append(win)
+        if not cols:
+            return pd.DataFrame(index=idx)
+        ids = np.array([self._pos[c] for c in cols])
+        win = self._scale(np.stack(hist), ids).astype("float32")
+        return pd.DataFrame(self._unscale(self._recursive(win, ids, steps), ids).T, index=idx, columns=cols)
+
+    def rolling_forecast(self, df: pd.DataFrame, steps: int) -> np.ndarray:
+        """
+        Pronóstico recursivo a `steps` meses desde cada origen t (la ventana
+        termina en t), todas las series y orígenes en un solo lote:
+        (serie x origen x paso), alineado con df. NaN si la ventana tiene
+        huecos o la serie no está en el modelo.
+        """
+        out = np.full((df.shape[1], len(df), steps), np.nan)
+        cols = [c for c in df.columns if c in self._pos]
+        if len(df) < self.window or not cols:
+            return out
+        df = self._prepare(df)
+        ids = np.array([self._pos[c] for c in cols])
+        V = self._scale(df[cols].to_numpy(dtype="float64").T, ids)          # (k, T)
+        W = sliding_window_view(V, self.window, axis=1)                      # (k, T - window + 1, window)
+        kk, tt = np.nonzero(~np.isnan(W).any(axis=2))
+        if len(kk):
+            preds = self._recursive(W[kk, tt].astype("float32"), ids[kk], steps)
+            pos = np.array([df.columns.get_loc(c) for c in cols])
+            out[pos[kk], tt + self.window - 1] = self._unscale(preds, ids[kk])
+        return out
+
+    def _recursive(self, win: np.ndarray, ids: np.ndarray, steps: int) -> np.ndarray:
+        """Ventanas escaladas (b, window) -> (b, steps) escalado; cada predicción entra a la ventana."""
+        preds = np.empty((len(win), steps), dtype="float32")
+        for s in range(0, steps, self.horizon):
+            p = self.forward(self._inputs(win, ids))                     # (b, horizon)
+            n = min(self.horizon, steps - s)
+            preds[:, s:s + n] = p[:, :n]
+            win = np.concatenate([win[:, n:], p[:, :n]], axis=1)
+        return preds
+
+@lru_cache(maxsize=1)
+def load_lstm(path: str = str(LSTM_NPZ)) -> NumpyLSTM | None:
+    """Modelo del proceso, o None si no hay pesos exportados."""
+    return NumpyLSTM(path) if Path(path).exists() else None
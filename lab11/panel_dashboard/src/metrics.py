@@ -4,14 +4,98 @@ import pandas as pd
 
 def mae(y_true, y_pred): return np.mean(np.abs(y_true - y_pred))
 def rmse(y_true, y_pred): return np.sqrt(np.mean((y_true - y_pred)**2))
-def mape(y_true, y_pred): 
-    y = np.where(y_true==0, np.nan, y_true)
-    return np.nanmean(np.abs((y - y_pred)/y))*100
+def mape(y_true, y_pred):
+    # Máscara de ceros/NaN en vez de una copia con NaN sustituidos
+    return float(batched_metrics(y_true, y_pred)["MAPE"])
 
-def dummy_metrics_table(series):
+# =========================
+# Kernels en lote (series x origen x horizonte, o cualquier forma)
+# =========================
+def error_sums(y_true, y_pred, axis=None) -> dict:
+    """
+    Sumas suficientes para MAE/RMSE/MAPE reduciendo `axis` en una sola pasada.
+    Ignora pares con NaN; MAPE además ignora y_true == 0. Admite broadcasting
+    (p.ej. y_true (S, O, H) contra y_pred (M, S, O, H)).
+    """
+    y_true, y_pred = np.asarray(y_true, dtype="float64"), np.asarray(y_pred, dtype="float64")
+    err = y_pred - y_true
+    ok = ~np.isnan(err)
+    abs_err = np.abs(err, where=ok, out=np.zeros_like(err))
+    pct_ok = ok & (y_true != 0)
+    ape = np.divide(abs_err, np.abs(y_true), where=pct_ok, out=np.zeros_like(err))
+    return {
+        "n": np.count_nonzero(ok, axis=axis),
+        "abs": abs_err.sum(axis=axis),
+        "sq": np.square(abs_err).sum(axis=axis),
+        "n_pct": np.count_nonzero(pct_ok, axis=axis),
+        "ape": ape.sum(axis=axis),
+    }
+
+def metrics_from_sums(sums: dict) -> dict:
+    """MAE, RMSE y MAPE (%) a partir de las sumas; NaN donde no hay datos."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.where(sums["n"] > 0, sums["n"], np.nan)
+        n_pct = np.where(sums["n_pct"] > 0, sums["n_pct"], np.nan)
+        return {
+            "MAE": sums["abs"] / n,
+            "RMSE": np.sqrt(sums["sq"] / n),
+            "MAPE": sums["ape"] / n_pct * 100,
+        }
+
+def batched_metrics(y_true, y_pred, axis=None) -> dict:
+    """MAE/RMSE/MAPE reduciendo `axis` (int o tupla) sobre tensores con NaN."""
+    return metrics_from_sums(error_sums(y_true, y_pred, axis=axis))
+
+class MetricAccumulator:
+    """
+    Acumulador incremental (sumas corrientes) para backtests largos: se
+    alimenta por bloques de residuales y nunca guarda los residuales.
+
+        acc = MetricAccumulator(axis=(1, 2))
+        for bloque in bloques: acc.update(y_true, y_pred)
+        acc.result()  # {"MAE": ..., "RMSE": ..., "MAPE": ...}
+    """
+
+    def __init__(self, axis=None):
+        self.axis = axis
+        self.sums = None
+
+    def update(self, y_true, y_pred) -> "MetricAccumulator":
+        part = error_sums(y_true, y_pred, axis=self.axis)
+        if self.sums is None:
+            self.sums = part
+        else:
+            self.sums = {k: self.sums[k] + part[k] for k in part}
+        return self
+
+    def result(self) -> dict:
+        if self.sums is None:
+            raise ValueError("MetricAccumulator sin datos: llama a update() primero")
+        return metrics_from_sums(self.sums)
+
+def backtest_metrics_table(bt: dict, series, start=None, end=None) -> pd.DataFrame:
+    """
+    MAE/RMSE/MAPE por serie y modelo sobre todos los horizontes, con origen y
+    mes objetivo (origen + h) dentro de [start, end]: los pronósticos desde
+    el final del rango que caen después de `end` no cuentan.
+    """
+    origins = bt["origins"]
+    i0 = 0 if start is None else int(origins.searchsorted(start, side="left"))
+    i1 = len(origins) if end is None else int(origins.searchsorted(end, side="right"))
+    sel = [s for s in series if s in bt["series"]]
+    idx = [bt["series"].index(s) for s in sel]
+    # Objetivo fuera del rango -> NaN en el real (error_sums ignora esos pares)
+    actual = bt["actual"][idx, i0:i1]
+    target = np.arange(i0, i1)[:, None] + np.asarray(bt["horizons"])[None, :]
+    if (target >= i1).any():
+        actual = np.where(target < i1, actual, np.nan)
+    # (modelo x serie) en una sola reducción sobre (origen, horizonte)
+    res = batched_metrics(actual, bt["forecast"][:, idx, i0:i1], axis=(-2, -1))
     rows = []
-    for s in series:
-        for m in ["Naive","SNaive12","HoltWinters"]:
-            rows.append(dict(Serie=s, Modelo=m, MAE=np.random.rand(),
-                             RMSE=np.random.rand(), MAPE=np.random.rand()*10))
-    return pd.DataFrame(rows)
+    for k, s in enumerate(sel):
+        for j, m in enumerate(bt["models"]):
+            if np.isnan(res["MAE"][j, k]):
+                continue
+            rows.append(dict(Serie=s, Modelo=m, MAE=res["MAE"][j, k],
+                             RMSE=res["RMSE"][j, k], MAPE=res["MAPE"][j, k]))
+    return pd.DataFrame(rows, columns=["Serie", "Modelo", "MAE", "RMSE", "MAPE"])
@@ -0,0 +1,20 @@
+# src/models.py
+# Ajuste de modelos sin dependencias de Panel/HoloViews: se importa también
+# desde los procesos del pool de ajuste, así que debe ser ligero.
+import numpy as np
+
+try:
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    HAS_SM = True
+except Exception:
+    HAS_SM = False
+
+def fit_holt_winters(values: np.ndarray, seasonal_periods: int = 12) -> dict:
+    """Holt-Winters aditivo (statsmodels) -> {'fitted': in-sample, 'params': dict}."""
+    model = ExponentialSmoothing(
+        np.asarray(values, dtype="float64"), trend='add', seasonal='add',
+        seasonal_periods=seasonal_periods, initialization_method="estimated"
+    )
+    res = model.fit(optimized=True)
+    params = {k: np.asarray(v).tolist() for k, v in res.params.items() if v is not None}
+    return {"fitted": np.asarray(res.fittedvalues, dtype="float64"), "params": params}
@@ -1,10 +1,17 @@
 # src/preprocess.py
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
 SERIES = ["Regular_Imp","Superior_Imp","Diesel_Imp","Regular_Con","Superior_Con","Diesel_Con"]
 
-def load_combustibles():
+# Versión del formato de la caché; súbela si cambia el layout en disco
+_CACHE_FORMAT = 1
+
+def combustibles_csv_path() -> Path:
     # preproces.py -> src -> panel_dashboard -> lab11 -> (sube a) raíz del repo
     repo_root = Path(__file__).resolve().parents[3]  # <-- antes estaba [2]
     csv_path = repo_root / "lab2" / "data" / "clean" / "Series_de_Tiempo_Combustibles.csv"
@@ -14,10 +21,83 @@ def load_combustibles():
         alt = Path(__file__).resolve().parents[1] / "data" / "combustibles.csv"
         if alt.exists():
             csv_path = alt
+    return csv_path
+
+def _cache_dir(csv_path: Path) -> Path:
+    """Carpeta de la caché columnar, junto al CSV: .cache/<nombre del CSV>/"""
+    return csv_path.parent / ".cache" / csv_path.stem
+
+def _source_signature(csv_path: Path) -> dict:
+    st = csv_path.stat()
+    return {"format": _CACHE_FORMAT, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def combustibles_version(csv_path: Path | None = None) -> str:
+    """Identificador corto de la versión de los datos (cambia si cambia el CSV)."""
+    csv_path = csv_path or combustibles_csv_path()
+    sig = json.dumps(_source_signature(csv_path), sort_keys=True)
+    return hashlib.sha1(sig.encode()).hexdigest()[:12]
+
+def _read_cache(csv_path: Path) -> pd.DataFrame | None:
+    """
+    Devuelve el DataFrame desde la caché (memory-mapped) si sigue vigente.
+    La caché es válida mientras el mtime y el tamaño del CSV no cambien.
+    """
+    cdir = _cache_dir(csv_path)
+    try:
+        meta = json.loads((cdir / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("source") != _source_signature(csv_path):
+        return None
+    try:
+        fechas = np.load(cdir / "fecha.npy", mmap_mode="r")
+        # (n_filas x n_series) en orden Fortran: cada columna es contigua en disco
+        values = np.load(cdir / "values.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    idx = pd.DatetimeIndex(np.asarray(fechas), name="fecha")
+    return pd.DataFrame(values, index=idx, columns=meta["columns"], copy=False)
+
+def _write_cache(csv_path: Path, df: pd.DataFrame) -> None:
+    """Escribe fecha.npy + values.npy + meta.json de forma atómica (tmp + replace)."""
+    if not all(np.issubdtype(t, np.floating) for t in df.dtypes):
+        return  # solo cacheamos series numéricas
+    cdir = _cache_dir(csv_path)
+    try:
+        cdir.mkdir(parents=True, exist_ok=True)
+        values = np.asfortranarray(df.to_numpy(dtype="float64"))
+        for name, arr in (("fecha.npy", df.index.values), ("values.npy", values)):
+            tmp = cdir / f".{name}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                np.save(fh, arr)
+            os.replace(tmp, cdir / name)
+        # meta.json va al final: es lo que da por válida la caché
+        meta = {"source": _source_signature(csv_path), "columns": list(df.columns)}
+        tmp = cdir / f".meta.json.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, cdir / "meta.json")
+    except OSError as e:
+        # Sin permisos de escritura, etc.: seguimos sin caché
+        print(f"[load_combustibles] No se pudo escribir la caché: {e}")
+
+def load_update_file(path) -> pd.DataFrame:
+    """Archivo de meses nuevos (p.ej. importacion_2025_actualizado.csv), indexado por fecha."""
+    df = pd.read_csv(path, parse_dates=["fecha"])
+    return df.set_index("fecha").sort_index()
+
+def load_combustibles(use_cache: bool = True):
+    csv_path = combustibles_csv_path()
+
+    if use_cache and csv_path.exists():
+        df = _read_cache(csv_path)
+        if df is not None:
+            return df
 
     # Debug útil si vuelve a fallar
     print(f"[load_combustibles] Leyendo CSV desde: {csv_path}")
 
     df = pd.read_csv(csv_path, parse_dates=["fecha"])
     df = df.set_index("fecha").sort_index()
+    if use_cache:
+        _write_cache(csv_path, df)
     return df
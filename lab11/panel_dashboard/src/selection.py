@@ -0,0 +1,94 @@
+# src/selection.py
+import pandas as pd
+import panel as pn
+import param
+from panel.io.document import hold
+from panel.io.state import set_curdoc
+
+class Selection(param.Parameterized):
+    """
+    Selección (series, rango de fechas) compartida por todas las vistas de una sesión.
+
+    Cada cambio de los widgets se traduce UNA sola vez en posiciones [i0, i1)
+    sobre el DatetimeIndex ordenado del store (searchsorted, O(log n)) y en un
+    `frame` con solo esas filas y columnas. Las vistas dependen de `frame` y
+    reutilizan `bounds` para cortar tablas derivadas alineadas con el store.
+
+    Modo live: cuando el store agrega meses y el rango llega hasta el final,
+    el rango se extiende y `appended` = (frame, filas nuevas) se publica en el
+    mismo batch que `frame`. Las vistas con streams (panorama, real_predicho)
+    usan `delta_for(frame)` para extender sus gráficas en vez de redibujarlas.
+    """
+    series = param.List(default=[])
+    start = param.Parameter(default=None)
+    end = param.Parameter(default=None)
+    bounds = param.NumericTuple(default=(0, 0), length=2)
+    frame = param.DataFrame(default=None, allow_None=True)
+    appended = param.Parameter(default=None)
+
+    def __init__(self, store, series_w, range_w, **params):
+        super().__init__(**params)
+        self.store = store
+        self._series_w = series_w
+        self._range_w = range_w
+        self._doc = pn.state.curdoc
+        series_w.param.watch(self._on_change, "value")
+        range_w.param.watch(self._on_change, "value_throttled")
+        self._on_change()
+        unsubscribe = store.subscribe(self._on_store_append)
+        if self._doc is not None and self._doc.session_context is not None:
+            self._doc.on_session_destroyed(lambda ctx: unsubscribe())
+
+    def positions(self, start, end, index: pd.DatetimeIndex | None = None) -> tuple[int, int]:
+        """Posiciones [i0, i1) de fechas en [start, end] dentro de un índice ordenado."""
+        idx = self.store.fechas if index is None else index
+        return int(idx.searchsorted(start, side="left")), int(idx.searchsorted(end, side="right"))
+
+    def _on_change(self, *events):
+        # `value` ya coincide con value_throttled al soltar el slider y además
+        # refleja las extensiones del modo live (que no tocan value_throttled)
+        ev = next((e for e in events if e.name == "value_throttled"), None)
+        dr = ev.new if ev is not None else self._range_w.value
+        start, end = pd.Timestamp(dr[0]), pd.Timestamp(dr[1])
+        series = [s for s in self._series_w.value if s in self.store.df.columns]
+        i0, i1 = self.positions(start, end)
+        frame = self.store.df.iloc[i0:i1][series]
+        # Un solo batch: las vistas que dependen de `frame` se ejecutan una vez.
+        # hold(freeze=True) junta los parches de todas las figuras en un mensaje
+        # y recalcula el grafo de modelos Bokeh una sola vez (no una por figura).
+        with hold(self._doc, freeze=True):
+            self.param.update(series=series, start=start, end=end, bounds=(i0, i1), frame=frame)
+
+    def delta_for(self, frame) -> pd.DataFrame | None:
+        """Filas nuevas si `frame` viene de un append que solo extendió el rango."""
+        if self.appended is not None and self.appended[0] is frame:
+            return self.appended[1]
+        return None
+
+    def _on_store_append(self, rows):
+        # Llega desde el hilo del watcher: se aplica en el tick de la sesión
+        doc = self._doc
+        if doc is None or doc.session_context is None:
+            self._apply_append(rows)
+            return
+        def _apply():
+            with set_curdoc(doc):
+                self._apply_append(rows)
+        doc.add_next_tick_callback(_apply)
+
+    def _apply_append(self, rows):
+        fechas = self.store.fechas
+        old_last = fechas[fechas.searchsorted(rows.index[0]) - 1]
+        follow = self.end is not None and self.end >= old_last
+        self._range_w.end = fechas[-1]
+        if not follow:
+            return
+        end = fechas[-1]
+        # value_throttled solo lo escribe el navegador: se mueve `value` y se
+        # publica el nuevo corte directamente (sin pasar por _on_change)
+        self._range_w.value = (self.start, end)
+        i0, i1 = self.positions(self.start, end)
+        frame = self.store.df.iloc[i0:i1][self.series]
+        delta = rows.loc[rows.index >= self.start, self.series]
+        with hold(self._doc, freeze=True):
+            self.param.update(end=end, bounds=(i0, i1), appended=(frame, delta), frame=frame)
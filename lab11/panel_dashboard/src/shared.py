@@ -0,0 +1,168 @@
+# src/shared.py
+"""
+Dataset en memoria compartida para `panel serve --num-procs N`.
+
+El primer worker publica el frame en un bloque `multiprocessing.shared_memory`
+y el resto se adjunta sin copiar. Layout del bloque:
+
+    [0:8)    magic b"CMBSHM1\\0"
+    [8:16)   estado: 0 = escribiendo, 1 = listo (uint64)
+    [16:24)  largo del header JSON (uint64)
+    [24:...) header JSON (schema) + padding a 64 bytes
+    [...]    fechas (n_filas, dtype del índice)
+    [...]    valores float64 (n_filas x n_series, orden Fortran)
+
+El worker que publica una versión elimina los bloques de versiones
+anteriores y el suyo al salir. Un bloque que nunca quedó listo se vuelve a
+publicar en lugar de impedir que arranquen los demás workers.
+"""
+import atexit
+import json
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+
+_MAGIC = b"CMBSHM1\0"
+_PREFIX = 24
+_ALIGN = 64
+
+# Bloques abiertos por este proceso: mantienen vivo el mapeo de los frames
+_ATTACHED: dict[str, shared_memory.SharedMemory] = {}
+
+# Donde Linux expone los bloques POSIX (para encontrar los de versiones viejas)
+_SHM_DIR = Path("/dev/shm")
+
+def shm_name(version: str) -> str:
+    return f"combustibles-{version}"
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def _untrack(shm: shared_memory.SharedMemory) -> None:
+    # El resource_tracker de Python < 3.13 destruye el bloque cuando sale el
+    # proceso que lo registró; aquí el bloque vive mientras viva el server.
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+def _frame_from(shm: shared_memory.SharedMemory) -> pd.DataFrame:
+    buf = shm.buf
+    hlen = int(np.frombuffer(buf, dtype=np.uint64, count=1, offset=16)[0])
+    schema = json.loads(bytes(buf[_PREFIX:_PREFIX + hlen]))
+    n, k = schema["n_rows"], len(schema["columns"])
+    fechas = np.ndarray((n,), dtype=np.dtype(schema["index_dtype"]), buffer=buf, offset=schema["index_offset"])
+    values = np.ndarray((n, k), dtype=np.float64, buffer=buf, offset=schema["values_offset"], order="F")
+    fechas.flags.writeable = False
+    values.flags.writeable = False
+    idx = pd.DatetimeIndex(fechas, name=schema["index_name"])
+    _ATTACHED[shm.name] = shm
+    return pd.DataFrame(values, index=idx, columns=schema["columns"], copy=False)
+
+def publish_frame(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Crea el bloque `name` con el contenido de df y devuelve un frame sobre él."""
+    fechas = df.index.values
+    values = df.to_numpy(dtype="float64")
+    schema = {
+        "columns": list(df.columns),
+        "n_rows": len(df),
+        "index_name": df.index.name,
+        "index_dtype": fechas.dtype.str,
+    }
+    # Offsets dependen del largo del header; se estima con placeholders anchos
+    probe = json.dumps({**schema, "index_offset": 10**15, "values_offset": 10**15}).encode()
+    index_offset = _aligned(_PREFIX + len(probe))
+    values_offset = _aligned(index_offset + fechas.nbytes)
+    header = json.dumps({**schema, "index_offset": index_offset, "values_offset": values_offset}).encode()
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=values_offset + values.nbytes)
+    _untrack(shm)
+    buf = shm.buf
+    buf[0:8] = _MAGIC
+    state = np.ndarray((2,), dtype=np.uint64, buffer=buf, offset=8)
+    state[0] = 0
+    state[1] = len(header)
+    buf[_PREFIX:_PREFIX + len(header)] = header
+    np.ndarray(fechas.shape, dtype=fechas.dtype, buffer=buf, offset=index_offset)[:] = fechas
+    np.ndarray(values.shape, dtype=np.float64, buffer=buf, offset=values_offset, order="F")[:] = values
+    state[0] = 1  # listo: los demás workers ya pueden adjuntarse
+    return _frame_from(shm)
+
+def attach_frame(name: str, timeout: float = 10.0) -> pd.DataFrame:
+    """Se adjunta (zero-copy) a un bloque publicado; espera si aún se está escribiendo."""
+    shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    state = np.ndarray((1,), dtype=np.uint64, buffer=shm.buf, offset=8)
+    deadline = time.monotonic() + timeout
+    while state[0] != 1:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"El bloque '{name}' no terminó de publicarse")
+        time.sleep(0.01)
+    if bytes(shm.buf[0:8]) != _MAGIC:
+        raise ValueError(f"El bloque '{name}' no es un dataset de combustibles")
+    return _frame_from(shm)
+
+def load_shared(version: str, loader) -> pd.DataFrame:
+    """
+    Devuelve el frame de la versión dada desde memoria compartida; si nadie
+    lo ha publicado aún, lo carga con `loader()` y lo publica.
+
+    Un bloque que nunca quedó listo (el worker que lo creaba murió) se
+    elimina y se vuelve a publicar; si aun así no se puede adjuntar, el
+    worker usa su propia copia de `loader()` en lugar de no arrancar.
+    """
+    name = shm_name(version)
+    try:
+        return attach_frame(name)
+    except FileNotFoundError:
+        pass
+    except (TimeoutError, ValueError) as e:
+        print(f"[shared] {e}: se elimina y se vuelve a publicar")
+        _unlink(name)
+    df = loader()
+    try:
+        frame = publish_frame(df, name)
+    except FileExistsError:
+        # Otro worker ganó la carrera de creación
+        try:
+            return attach_frame(name)
+        except (FileNotFoundError, TimeoutError, ValueError) as e:
+            print(f"[shared] {e}: este worker usa su propia copia")
+            return df
+    # El publicador libera los bloques de versiones anteriores y el propio al salir
+    release_stale(version)
+    atexit.register(release_shared, version)
+    return frame
+
+def _unlink(name: str) -> None:
+    """Quita el nombre del bloque; los mapeos existentes (frames en uso) siguen válidos."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    try:
+        shm.unlink()   # también lo quita del resource_tracker
+    except FileNotFoundError:
+        pass
+    shm.close()
+
+def release_shared(version: str) -> None:
+    """
+    Elimina el bloque del sistema (al salir el worker que lo publicó o al
+    cambiar de versión). Los workers ya adjuntos conservan su mapeo; uno
+    nuevo lo vuelve a publicar.
+    """
+    _unlink(shm_name(version))
+
+def release_stale(current: str) -> list[str]:
+    """Elimina los bloques de versiones distintas de `current` (CSV reemplazado) y devuelve sus nombres."""
+    prefix, keep = shm_name(""), shm_name(current)
+    try:
+        names = [p.name for p in _SHM_DIR.iterdir() if p.name.startswith(prefix) and p.name != keep]
+    except OSError:
+        return []   # sin /dev/shm (p.ej. macOS): nada que limpiar
+    for name in names:
+        _unlink(name)
+    return names
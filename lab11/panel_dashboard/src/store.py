@@ -0,0 +1,128 @@
+# src/store.py
+import os
+import threading
+import numpy as np
+import pandas as pd
+import panel as pn
+
+from src.preprocess import load_combustibles, combustibles_version
+from src.aggregates import PeriodPrefixSums
+from src.shared import load_shared
+from src.artifacts import load_artifact
+
+# Reglas de resample usadas por la vista Panorama
+RESAMPLE_RULES = {"Mensual": "MS", "Trimestral": "QS", "Anual": "YS"}
+
+# Cortes temporales de Panorama: (desde, hasta) con hasta exclusivo
+EPOCH_CUT = pd.Timestamp("2020-01-01")
+EPOCHS = {"Todo": (None, None), "Pre-2020": (None, EPOCH_CUT), "Post-2020": (EPOCH_CUT, None)}
+
+# Con `panel serve --num-procs N` exporta COMBUSTIBLES_SHARED=1 para que los
+# workers compartan un único bloque de memoria con las series numéricas.
+SHARED_MEMORY = os.environ.get("COMBUSTIBLES_SHARED", "0") == "1"
+
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve el mismo frame respaldado por un único bloque NumPy de solo lectura."""
+    values = df.to_numpy(dtype="float64")
+    values.flags.writeable = False
+    return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+
+class DataStore:
+    """
+    Dataset de combustibles compartido por todas las sesiones del proceso.
+    El frame es de solo lectura; las tablas derivadas se calculan una vez
+    (de forma perezosa) y se reutilizan tal cual entre sesiones.
+    En modo live (src/live.py) `append` reemplaza el frame por uno con los
+    meses nuevos y avisa a las sesiones suscritas.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str):
+        self.base_version = version
+        self._derived = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._set_frame(df, version)
+
+    def _set_frame(self, df: pd.DataFrame, version: str) -> None:
+        self.df = _freeze(df)
+        self.version = version
+        self.fechas: pd.DatetimeIndex = self.df.index
+        months = self.fechas.month.to_numpy(dtype=np.int8)
+        months.flags.writeable = False
+        self.months = months
+        self._derived = {}
+
+    def subscribe(self, callback):
+        """
+        Registra callback(rows) para cada append (se llama en el hilo que
+        agrega). Devuelve una función que cancela la suscripción.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+        def _unsubscribe():
+            with self._lock:
+                if callback in self._listeners:
+                    self._listeners.remove(callback)
+        return _unsubscribe
+
+    def append(self, rows: pd.DataFrame) -> pd.DataFrame | None:
+        """
+        Agrega meses posteriores al último del store (modo live). Las columnas
+        desconocidas se ignoran y las faltantes quedan en NaN. La versión pasa
+        a '<base>+<n filas>', así que backtest y ajustes cacheados por versión
+        se recalculan; las tablas derivadas se vacían. Devuelve las filas
+        agregadas (None si no había nada nuevo) y avisa a los suscriptores.
+        """
+        with self._lock:
+            rows = rows.reindex(columns=self.df.columns).astype("float64")
+            rows = rows[rows.index > self.fechas[-1]].dropna(how="all")
+            rows = rows[~rows.index.duplicated(keep="last")]
+            if rows.empty:
+                return None
+            df = pd.concat([self.df, rows])
+            self._set_frame(df, f"{self.base_version}+{len(df)}")
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(rows)
+        return rows
+
+    def cached(self, key, fn):
+        """Tabla derivada `key`, calculada con fn() la primera vez y compartida después."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = fn()
+            return self._derived[key]
+
+    def prefix_sums(self, freq: str) -> PeriodPrefixSums:
+        """Sumas acumuladas por periodo ('Año' o 'Trimestre') de todas las series."""
+        return self.cached(("prefix_sums", freq), lambda: PeriodPrefixSums(self.df, freq))
+
+    def pyramid(self, epoch: str) -> dict[str, pd.DataFrame]:
+        """
+        Pirámide de agregados {Mensual, Trimestral, Anual} (suma por periodo)
+        para un corte temporal. Se construye una vez por corte y la vista solo
+        la rebana; cambiar de frecuencia es un lookup en el dict.
+        """
+        def _build():
+            lo, hi = EPOCHS[epoch]
+            i0 = 0 if lo is None else int(self.fechas.searchsorted(lo, side="left"))
+            i1 = len(self.fechas) if hi is None else int(self.fechas.searchsorted(hi, side="left"))
+            base = self.df.iloc[i0:i1]
+            return {label: _freeze(base.resample(rule).sum()) for label, rule in RESAMPLE_RULES.items()}
+        return self.cached(("pyramid", epoch), _build)
+
+def _build_store(version: str) -> DataStore:
+    # Artefacto precalculado (python -m src.build_artifacts): se abre con mmap una vez
+    if load_artifact(version) is not None:
+        print(f"[store] Artefacto de pronósticos para la versión {version}")
+    if SHARED_MEMORY:
+        return DataStore(load_shared(version, load_combustibles), version)
+    return DataStore(load_combustibles(), version)
+
+def get_store() -> DataStore:
+    """
+    Store del proceso vía pn.state.cache. La clave incluye la versión de los
+    datos, así que un CSV nuevo genera un store nuevo sin reiniciar el server.
+    """
+    version = combustibles_version()
+    return pn.state.as_cached(f"combustibles-store-{version}", _build_store, version=version)
@@ -1,9 +1,14 @@
+import bisect
+from functools import partial
 import pandas as pd
 import numpy as np
 import panel as pn
 import holoviews as hv
 import hvplot.pandas  # noqa
 import param
+from param import Skip
+from src.anomaly import zscore_engine, StreamingZScorer
+from src.visuals.patch import PatchablePlot
 
 hv.extension("bokeh")
 
@@ -38,9 +43,40 @@ COLOR_BY_BASE = {
 # =========================
 class _AnomalyState(param.Parameterized):
     anomaly_dates = param.List(default=[])
+    # Configuración con la que se calcularon las fechas (la usa el scoring incremental)
+    series = param.List(default=[])
+    window = param.Integer(default=12)
+    threshold = param.Number(default=2.0)
 
 ANOMALY_STATE = _AnomalyState()
 
+def streaming_scorer(store) -> StreamingZScorer:
+    """Scorer incremental del proceso, arrancado al final del histórico del store."""
+    return store.cached(("zscorer",), lambda: StreamingZScorer.from_history(store.df))
+
+def score_appended(scorer: StreamingZScorer, rows: pd.DataFrame) -> list:
+    """
+    Puntúa filas nuevas (índice = fecha) en O(1) por dato y agrega a
+    ANOMALY_STATE.anomaly_dates las fechas con |z| >= umbral para la
+    ventana/series actuales, sin recalcular el histórico. Devuelve las fechas nuevas.
+    """
+    st = ANOMALY_STATE
+    dates = list(st.anomaly_dates)
+    added = []
+    for fecha, row in rows.sort_index().iterrows():
+        zs = scorer.push(fecha, row.to_dict())
+        hit = any(abs(z.get(st.window, np.nan)) >= st.threshold
+                  for s, z in zs.items() if s in st.series)
+        if hit:
+            fecha = pd.Timestamp(fecha)
+            i = bisect.bisect_left(dates, fecha)
+            if i == len(dates) or dates[i] != fecha:
+                dates.insert(i, fecha)
+                added.append(fecha)
+    if added:
+        st.anomaly_dates = dates
+    return added
+
 
 # =========================
 # Utilidades
@@ -51,14 +87,6 @@ def _right_header(text: str):
         styles={"text-align": "right", "margin": "0 8px 6px 0"}
     )
 
-def _ensure_fecha(df: pd.DataFrame) -> pd.Series:
-    """Devuelve Serie datetime llamada 'fecha' (desde columna o índice)."""
-    if "fecha" in df.columns:
-        f = pd.to_datetime(df["fecha"])
-    else:
-        f = pd.to_datetime(df.index)
-    return f.rename("fecha")
-
 def _base_from(col: str) -> str:
     try:
         base, _ = col.split("_", 1)
@@ -70,30 +98,59 @@ def _base_from(col: str) -> str:
 # =========================
 # Z-scores respecto a media móvil
 # =========================
-def _roll_stats(y: pd.Series, window: int) -> tuple[pd.Series, pd.Series]:
-    mu = y.rolling(window=window, min_periods=window).mean()
-    sd = y.rolling(window=window, min_periods=window).std(ddof=0)
-    return mu, sd
-
-def _zscores_vs_time(ser: pd.Series, window: int) -> pd.DataFrame:
-    mu, sd = _roll_stats(ser, window)
-    resid = ser - mu
-    z = resid / sd
-    out = pd.DataFrame({
-        "fecha": ser.index,
-        "valor": ser.values,
-        "media": mu.values,
-        "std":   sd.values,
-        "resid": resid.values,
-        "z":     z.values
-    }).dropna()
-    return out
-
+def _zscores_vs_time(zs: dict, k: int, fechas: pd.DatetimeIndex, i0: int, i1: int) -> pd.DataFrame:
+    """Corte [i0, i1) de la columna k de la matriz de z-scores cacheada (sin recalcular)."""
+    out = pd.DataFrame({"fecha": fechas[i0:i1]})
+    for name in ("valor", "media", "std", "resid", "z"):
+        out[name] = zs[name][i0:i1, k]
+    return out.dropna()
+
+
+_TABLE_COLS = ["fecha", "serie", "valor", "media", "resid", "z"]
+
+def _z_overlay(data: pd.DataFrame, present: tuple) -> hv.Overlay:
+    """z vs tiempo, anomalías y líneas de referencia de cada serie (desde el Buffer)."""
+    overlays = []
+    for s in present:
+        stats = data[data["Serie"] == s]
+        color = COLOR_BY_BASE.get(_base_from(s), COLOR_REAL)
+
+        # Puntos base (z vs tiempo)
+        base_pts = stats.hvplot.scatter(
+            x="fecha", y="z", color=color, alpha=0.9, size=5,
+            legend=False, tools=["hover"], height=380, width=1000, ylabel="z-score"
+        )
+
+        # Puntos de anomalía (siempre presentes, aunque vacíos: mismas capas en cada update)
+        an_pts = stats[stats["anom"]].hvplot.scatter(
+            x="fecha", y="z", color=COLOR_ANOMALIA, size=7, alpha=0.95,
+            marker="triangle", legend=False, tools=["hover"]
+        )
+
+        # Líneas de referencia
+        ref0 = stats.hvplot.line(x="fecha", y="z0", color=COLOR_GUIA, line_dash="dotted")
+        refp = stats.hvplot.line(x="fecha", y="zu", color=COLOR_GUIA, line_dash="dashed")
+        refn = stats.hvplot.line(x="fecha", y="zl", color=COLOR_GUIA, line_dash="dashed")
+
+        overlays.append(base_pts.opts(yticks=7) * an_pts.opts(yticks=7) * ref0.opts(yticks=7)
+                        * refp.opts(yticks=7) * refn.opts(yticks=7))
+    return hv.Overlay(overlays)
+
+def _mu_overlay(data: pd.DataFrame, present: tuple) -> hv.Overlay:
+    """Media móvil por serie (panel aparte)."""
+    mu_lines = []
+    for s in present:
+        color = COLOR_BY_BASE.get(_base_from(s), COLOR_REAL)
+        mu_lines.append(data[data["Serie"] == s].hvplot.line(
+            x="fecha", y="media", color=color, line_dash="dotdash", alpha=0.9,
+            ylabel="Media móvil"
+        ))
+    return hv.Overlay(mu_lines)
 
 # =========================
 # Vista principal
 # =========================
-def anomalias_view(df: pd.DataFrame, series_w, range_w):
+def anomalias_view(sel):
     """
     Dispersión de z-score vs tiempo por series seleccionadas.
     - Controles: ventana (3/6/12), umbral |z|, toggle "Mostrar media móvil".
@@ -107,118 +164,77 @@ def anomalias_view(df: pd.DataFrame, series_w, range_w):
     )
     mostrar_linea_w = pn.widgets.Checkbox(name="Mostrar media móvil", value=True)
 
+    # Figuras y tabla persistentes: ventana/umbral/rango solo parchean datos
+    plot = PatchablePlot()
+    tabla_w = pn.widgets.Tabulator(pd.DataFrame(columns=_TABLE_COLS), height=220,
+                                   pagination="local", page_size=10)
+    sin_anom = pn.pane.Markdown("_Sin anomalías con el umbral actual._", styles={"margin": "4px 0 0 0"})
+
     @pn.depends(
-        series_w.param.value,
-        range_w.param.value_throttled,
+        sel.param.frame,
         ventana_w.param.value,
         umbral_w.param.value,
         mostrar_linea_w.param.value
     )
-    def _view(series_sel, drange, ventana, umbral, show_mu):
+    def _view(x, ventana, umbral, show_mu):
+        series_sel = sel.series
         if not series_sel:
+            plot.reset()
             return pn.pane.Markdown("**Selecciona al menos una serie.**")
 
-        # Filtrar por rango
-        f = _ensure_fecha(df)
-        x = df.assign(fecha=f)
-        mask = (x["fecha"] >= pd.to_datetime(drange[0])) & (x["fecha"] <= pd.to_datetime(drange[1]))
-        x = x.loc[mask]
-
         if x.empty:
+            plot.reset()
             ANOMALY_STATE.anomaly_dates = []
             return pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
 
-        overlays = []      # aquí SOLO metemos Overlays
         fechas_anom = []   # acumulador de fechas anómalas
-        mu_lines = []      # líneas de media móvil por serie (para panel aparte)
+        anoms_by_s = {}    # anomalías por serie, reutilizadas por la tabla
+        pieces = []        # z-scores por serie (formato largo, fuente del Buffer)
+
+        # Media/desv./z de todas las series en una matriz cacheada por ventana;
+        # el umbral solo vuelve a comparar |z| >= umbral sobre el corte.
+        zs = zscore_engine(sel.store, ventana)
+        cols = list(sel.store.df.columns)
+        i0, i1 = sel.bounds
 
         for s in series_sel:
             if s not in x.columns:
                 continue
 
-            color = COLOR_BY_BASE.get(_base_from(s), COLOR_REAL)
-            ser = x.set_index("fecha")[s].astype(float).dropna()
-            if ser.empty:
+            stats = _zscores_vs_time(zs, cols.index(s), sel.store.fechas, i0, i1)
+            if stats.empty:
                 continue
 
-            stats = _zscores_vs_time(ser, ventana)
-
-            # Puntos base (z vs tiempo)
-            base_pts = stats.hvplot.scatter(
-                x="fecha", y="z", color=color, alpha=0.9, size=5,
-                legend=False, tools=["hover"], height=380, width=1000, ylabel="z-score"
-            )
-
-            # Líneas de referencia
-            ref0 = stats.assign(z0=0).hvplot.line(x="fecha", y="z0", color=COLOR_GUIA, line_dash="dotted")
-            refp = stats.assign(zu=umbral).hvplot.line(x="fecha", y="zu", color=COLOR_GUIA, line_dash="dashed")
-            refn = stats.assign(zl=-umbral).hvplot.line(x="fecha", y="zl", color=COLOR_GUIA, line_dash="dashed")
-
-            # Puntos de anomalía
+            # Puntos de anomalía y líneas de referencia como columnas
             anmask = np.abs(stats["z"]) >= umbral
-            anoms = stats.loc[anmask]
-            if not anoms.empty:
-                fechas_anom.extend(list(anoms["fecha"].values))
-                an_pts = anoms.hvplot.scatter(
-                    x="fecha", y="z", color=COLOR_ANOMALIA, size=7, alpha=0.95,
-                    marker="triangle", legend=False, tools=["hover"]
-                )
-            else:
-                an_pts = hv.Overlay([])
-
-            # Formateos simples (evitar .opts sobre Layouts)
-            base_pts = base_pts.opts(yticks=7)
-            an_pts   = an_pts.opts(yticks=7)
-            ref0     = ref0.opts(yticks=7)
-            refp     = refp.opts(yticks=7)
-            refn     = refn.opts(yticks=7)
-
-            # Overlay válido (sin Layouts)
-            overlay_piece = (base_pts * an_pts * ref0 * refp * refn)
-            overlays.append(overlay_piece)
-
-            # (Opcional) Media móvil en panel aparte
-            if show_mu:
-                mu_line = stats.hvplot.line(
-                    x="fecha", y="media", color=color, line_dash="dotdash", alpha=0.9,
-                    ylabel="Media móvil"
-                ).opts(height=160, width=1000)
-                mu_lines.append(mu_line)
-
-        if not overlays:
+            anoms_by_s[s] = stats.loc[anmask]
+            fechas_anom.extend(list(stats.loc[anmask, "fecha"].values))
+            pieces.append(stats.assign(Serie=s, anom=anmask.to_numpy(), z0=0.0, zu=umbral, zl=-umbral))
+
+        if not pieces:
+            plot.reset()
             ANOMALY_STATE.anomaly_dates = []
             return pn.pane.Markdown("**Sin datos modelables para las series seleccionadas.**")
 
-        # Combinar overlays (todos son Overlays)
-        chart = hv.Overlay(overlays)
+        # Actualizar fechas anómalas globales (y la configuración usada)
+        uniq = sorted(pd.to_datetime(pd.Index(fechas_anom)).unique()) if fechas_anom else []
+        ANOMALY_STATE.param.update(anomaly_dates=uniq, series=list(anoms_by_s),
+                                   window=int(ventana), threshold=float(umbral))
 
-        # Actualizar fechas anómalas globales
-        if fechas_anom:
-            uniq = sorted(pd.to_datetime(pd.Index(fechas_anom)).unique())
-            ANOMALY_STATE.anomaly_dates = uniq
-        else:
-            ANOMALY_STATE.anomaly_dates = []
-
-        # Tabla de anomalías
-        def _anom_table():
-            rows = []
-            for s in series_sel:
-                if s not in x.columns:
-                    continue
-                ser = x.set_index("fecha")[s].astype(float).dropna()
-                if ser.empty:
-                    continue
-                stats = _zscores_vs_time(ser, ventana)
-                anmask = np.abs(stats["z"]) >= umbral
-                if anmask.any():
-                    t = stats.loc[anmask, ["fecha", "valor", "media", "resid", "z"]].copy()
-                    t["serie"] = s
-                    rows.append(t)
-            if not rows:
-                return pn.pane.Markdown("_Sin anomalías con el umbral actual._", styles={"margin": "4px 0 0 0"})
+        # Tabla de anomalías (el mismo widget; solo cambia su valor)
+        rows = [anoms[["fecha", "valor", "media", "resid", "z"]].assign(serie=s)
+                for s, anoms in anoms_by_s.items() if not anoms.empty]
+        if rows:
             tab = pd.concat(rows).sort_values(["fecha", "serie"]).reset_index(drop=True)
-            tab = tab[["fecha", "serie", "valor", "media", "resid", "z"]]
-            return pn.widgets.Tabulator(tab.head(200), height=220, pagination="local", page_size=10)
+            tabla_w.value = tab[_TABLE_COLS].head(200)
+        tabla_w.visible, sin_anom.visible = bool(rows), not rows
+
+        present = tuple(anoms_by_s)
+        if plot.show((present, show_mu), pd.concat(pieces, ignore_index=True)):
+            raise Skip
+
+        # Combinar overlays (todos son Overlays)
+        chart = plot.dmap(partial(_z_overlay, present=present))
 
         # Construcción de layout
         col = [
@@ -226,14 +242,15 @@ def anomalias_view(df: pd.DataFrame, series_w, range_w):
             pn.Row(ventana_w, umbral_w, pn.Spacer(width=12), mostrar_linea_w),
             pn.pane.HoloViews(chart, width=1000, height=380, sizing_mode="fixed"),
             pn.pane.Markdown("**Anomalías detectadas** (|z| ≥ umbral)"),
-            _anom_table()
+            sin_anom,
+            tabla_w,
         ]
 
         # Si se pidió media móvil, la mostramos debajo (combinada por series)
-        if show_mu and mu_lines:
-            mu_chart = hv.Overlay(mu_lines).opts(height=160, width=1000)
+        if show_mu:
+            mu_chart = plot.dmap(partial(_mu_overlay, present=present)).opts(height=160, width=1000)
             col.insert(3, pn.pane.HoloViews(mu_chart, sizing_mode="fixed"))
 
         return pn.Column(*col)
 
-    return pn.Column(_view)
\ No newline at end of file
+    return pn.Column(_view)
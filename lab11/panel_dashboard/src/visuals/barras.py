@@ -4,6 +4,8 @@ import panel as pn
 import holoviews as hv
 import hvplot.pandas
 from bokeh.models import HoverTool, NumeralTickFormatter
+from param import Skip
+from src.visuals.patch import PatchablePlot
 
 hv.extension('bokeh')
 
@@ -64,33 +66,20 @@ def _apply_series_alphas(plot, element):
             if hasattr(mg, "line_alpha"): mg.line_alpha = 0.25
 
 def _unmute_on_init(plot, element):
+    # Los hooks corren también en cada actualización de datos: solo la primera vez
+    if getattr(plot, "_unmuted", False):
+        return
+    plot._unmuted = True
     for r in plot.state.renderers:
         if hasattr(r, "muted"):
             r.muted = False
 
-def _ensure_fecha(df: pd.DataFrame) -> pd.Series | pd.DatetimeIndex:
-    """Devuelve la columna/índice de fechas como Series o DatetimeIndex."""
-    if 'fecha' in df.columns:
-        return pd.to_datetime(df['fecha'])
-    return pd.to_datetime(df.index)
-
-def _to_period_labels(fechas, freq: str) -> pd.Index | pd.Series:
-    """Convierte fechas a etiquetas de periodo (Año o Trimestre) como strings."""
-    if isinstance(fechas, pd.DatetimeIndex):
-        if freq == "Año":
-            return fechas.year.astype(str)
-        else:
-            return fechas.to_period('Q').astype(str)
-    else:
-        s = pd.to_datetime(fechas)
-        if freq == "Año":
-            return s.dt.year.astype(str)
-        else:
-            return s.dt.to_period('Q').astype(str)
-
 def _nice_hover_bars(plot, element):
     """Un HoverTool por stack con tooltips correctos."""
     fig = plot.state
+    hovers = [t for t in fig.tools if isinstance(t, HoverTool)]
+    if hovers and all(isinstance(t.renderers, list) for t in hovers):
+        return  # ya configurado; una actualización de datos no cambia los renderers
     fig.tools = [t for t in fig.tools if not isinstance(t, HoverTool)]
 
     for r in fig.renderers:
@@ -109,7 +98,7 @@ def _nice_hover_bars(plot, element):
         )
         fig.add_tools(ht)
 
-def barras_apiladas_view(df: pd.DataFrame, series_w, range_w):
+def barras_apiladas_view(sel):
     """
     Barras apiladas por producto/serie con:
       - Frecuencia: Año o Trimestre
@@ -119,50 +108,37 @@ def barras_apiladas_view(df: pd.DataFrame, series_w, range_w):
         name="Agregación", options=["Año", "Trimestre"], value="Año"
     )
 
-    @pn.depends(series_w.param.value, range_w.param.value_throttled, freq_w.param.value)
-    def _view(series_sel, drange, freq):
+    # Figura persistente por (agregación, series): el rango solo parchea datos
+    plot = PatchablePlot()
+
+    @pn.depends(sel.param.frame, freq_w.param.value)
+    def _view(dff, freq):
+        series_sel = sel.series
         if not series_sel:
+            plot.reset()
             return pn.pane.Markdown("**Selecciona al menos una serie para mostrar.**")
 
-        # Filtrar por rango temporal
-        fechas = _ensure_fecha(df)
-        start, end = pd.to_datetime(drange[0]), pd.to_datetime(drange[1])
-        mask = (fechas >= start) & (fechas <= end)
-        dff = df.loc[mask].copy()
-        fechas_f = fechas[mask]
-
         if dff.empty:
+            plot.reset()
             return pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
 
-        # Etiquetas de periodo (Año / Trimestre)
-        dff['Periodo'] = _to_period_labels(fechas_f, freq)
-
-        # Largo y agrupar por Periodo/Producto
-        use_cols = ['Periodo'] + list(series_sel)
-        long = dff[use_cols].melt(id_vars='Periodo', var_name='Producto', value_name='valor')
-        grp = long.groupby(['Periodo', 'Producto'], as_index=False)['valor'].sum()
-
-        # Pivot y orden cronológico por Periodo
-        piv = grp.pivot(index='Periodo', columns='Producto', values='valor').fillna(0).reset_index()
-
-        if freq == "Trimestre":
-            key = pd.PeriodIndex(piv['Periodo'], freq='Q')
-            piv = piv.iloc[key.argsort()].reset_index(drop=True)
-        else:
-            key = piv['Periodo'].astype(int)
-            piv = piv.iloc[key.argsort()].reset_index(drop=True)
-
-        ycols = [c for c in piv.columns if c != 'Periodo']
+        # Suma por Periodo/Producto vía sumas acumuladas: ya sale en orden
+        # cronológico (claves enteras) y con columnas ordenadas como el pivot
+        i0, i1 = sel.bounds
+        ycols = sorted(series_sel)
+        piv = sel.store.prefix_sums(freq).range_table(i0, i1, ycols)
+        if plot.show((freq, tuple(ycols)), piv):
+            raise Skip
 
         # Colores por serie según *_Imp vs *_Con
         series_colors = [_color_for(c) for c in ycols]
 
-        bars = piv.hvplot.bar(
+        bars = plot.dmap(lambda data: data.hvplot.bar(
             x='Periodo', y=ycols,
             stacked=True, height=320, width=1000,
             legend='top_left', xlabel="Periodo", ylabel="Valor",
             color=series_colors, tools=[]
-        ).opts(
+        )).opts(
             legend_muted=True, muted_alpha=0.15,
             yticks=6,
             yformatter=NumeralTickFormatter(format="0,0"),
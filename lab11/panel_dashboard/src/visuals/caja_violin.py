@@ -1,9 +1,13 @@
 # src/visuals/caja_violin.py
+from functools import partial
+import numpy as np
 import pandas as pd
 import panel as pn
 import holoviews as hv
-import hvplot.pandas
-from bokeh.models import HoverTool, NumeralTickFormatter
+from bokeh.models import NumeralTickFormatter
+from param import Skip
+from src.distributions import month_distribution
+from src.visuals.patch import PatchablePlot
 
 hv.extension("bokeh")
 
@@ -12,69 +16,94 @@ COLOR_BY_BASE = {'Regular': '#1f77b4', 'Superior': '#ff7f0e', 'Diesel': '#2ca02c
 def _right_header(text: str):
     return pn.pane.Markdown(f"### {text}", styles={'text-align': 'right','margin':'0 8px 6px 0'})
 
-def _ensure_fecha(df: pd.DataFrame) -> pd.Series:
-    if 'fecha' in df.columns: f = pd.to_datetime(df['fecha'])
-    else: f = pd.to_datetime(df.index)
-    return f.rename('fecha')
-
-def _pretty_hover(plot, element):
-    fig = plot.state
-    for t in fig.tools:
-        if isinstance(t, HoverTool):
-            t.tooltips = [("Mes","@Mes"), ("valor","$y{0,0}")]
-            t.mode = "mouse"
-
 def _base_from(col: str) -> str:
     try: base, _ = col.split('_',1)
     except ValueError: base = col
     return base
 
-def caja_violin_view(df: pd.DataFrame, series_w, range_w):
+def _dist_stats(store, serie: str, i0: int, i1: int) -> pd.DataFrame:
+    """
+    Caja, atípicos y KDE por mes de una serie en las filas [i0, i1). Una
+    sola entrada del store sirve a Caja y a Violín: cambiar de tipo no
+    recalcula; el append del modo live la descarta.
+    """
+    return store.cached(("dist_stats", serie, i0, i1),
+                        lambda: month_distribution(store.df[serie].to_numpy()[i0:i1], store.months[i0:i1]))
+
+_BOX_HOVER = [("Mes", "@Mes"), ("Q1", "@q1{0,0}"), ("Mediana", "@q2{0,0}"),
+              ("Q3", "@q3{0,0}"), ("bigotes", "@lo{0,0} – @hi{0,0}"), ("n", "@n")]
+_HALF = 0.35   # media anchura de caja/violín en unidades de mes
+
+def _dist_plot(data: pd.DataFrame, s: str, tipo: str, color: str):
+    """Glyphs de resumen (rectángulos, segmentos, polígonos) de una serie."""
+    d = data[data['Serie'] == s]
+    caja = d[d['capa'] == 'caja'].assign(x0=lambda t: t['Mes'] - _HALF, x1=lambda t: t['Mes'] + _HALF)
+    if tipo == "Caja":
+        body = hv.Rectangles(caja, kdims=['x0', 'q1', 'x1', 'q3'], vdims=['Mes', 'q2', 'lo', 'hi', 'n']).opts(
+            color=color, alpha=0.6, line_color='black', tools=['hover'], hover_tooltips=_BOX_HOVER)
+        median = hv.Segments(caja.assign(y0=caja['q2'], y1=caja['q2']), kdims=['x0', 'y0', 'x1', 'y1']).opts(
+            color='black', line_width=2)
+        whisk = pd.concat([caja.assign(y0=caja['lo'], y1=caja['q1']), caja.assign(y0=caja['q3'], y1=caja['hi'])])
+        whiskers = hv.Segments(whisk.assign(x0=whisk['Mes'], x1=whisk['Mes']), kdims=['x0', 'y0', 'x1', 'y1']).opts(
+            color='black')
+        atip = d[d['capa'] == 'atipico']
+        outliers = hv.Scatter(atip, 'Mes', 'valor').opts(color=color, size=5, line_color='black')
+        g = whiskers * body * median * outliers
+    else:
+        kde = d[d['capa'] == 'kde']
+        # Densidad escalada para que el violín más ancho de la serie mida 2·_HALF
+        w = _HALF * kde['densidad'] / (kde['densidad'].max() or 1.0)
+        polys = [
+            {'x': np.r_[m - w[grp.index], (m + w[grp.index])[::-1]], 'y': np.r_[grp['valor'], grp['valor'][::-1]]}
+            for m, grp in kde.groupby('Mes')
+        ]
+        body = hv.Polygons(polys).opts(color=color, alpha=0.6, line_color='black')
+        iqr = hv.Segments(caja.assign(x0=caja['Mes'], x1=caja['Mes']), kdims=['x0', 'q1', 'x1', 'q3']).opts(
+            color='black', line_width=5)
+        median = hv.Scatter(caja, 'Mes', ['q2', 'q1', 'q3', 'lo', 'hi', 'n']).opts(
+            color='white', size=6, line_color='black', tools=['hover'], hover_tooltips=_BOX_HOVER)
+        g = body * iqr * median
+    return g.opts(
+        width=1000, height=400, ylabel='Valor', xlabel='Mes', show_legend=False,
+        xticks=[(m, str(m)) for m in range(1, 13)], xlim=(0.4, 12.6),
+        yformatter=NumeralTickFormatter(format="0,0"),
+    )
+
+def caja_violin_view(sel):
     tipo_w = pn.widgets.RadioButtonGroup(name="Tipo", options=["Caja","Violín"], value="Caja")
+    # Figuras persistentes por (tipo, series con datos): el rango solo parchea datos
+    plot = PatchablePlot()
 
-    @pn.depends(series_w.param.value, range_w.param.value_throttled, tipo_w.param.value)
-    def _view(series_sel, dr, tipo):
+    @pn.depends(sel.param.frame, tipo_w.param.value)
+    def _view(x, tipo):
+        series_sel = sel.series
         if not series_sel:
+            plot.reset()
             return pn.pane.Markdown("**Selecciona al menos una serie.**")
 
-        f = _ensure_fecha(df)
-        x = df.assign(fecha=f).loc[(f>=pd.to_datetime(dr[0])) & (f<=pd.to_datetime(dr[1]))]
         if x.empty:
+            plot.reset()
             return pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
 
-        x = x.assign(Mes=x['fecha'].dt.month.astype(int))
-        long = x[['Mes']+list(series_sel)].melt(id_vars='Mes', var_name='Serie', value_name='valor').dropna()
+        # Resúmenes por (serie, mes) cacheados por versión y rango: el navegador
+        # solo recibe glyphs de resumen, no las observaciones
+        i0, i1 = sel.bounds
+        stats = {s: _dist_stats(sel.store, s, i0, i1) for s in series_sel}
+        present = tuple(s for s in series_sel if len(stats[s]))
+        if not present:
+            plot.reset()
+            return pn.pane.Markdown("**Sin datos para las series seleccionadas.**")
+        long = pd.concat([stats[s].assign(Serie=s) for s in present], ignore_index=True)
+        if plot.show((tipo, present), long):
+            raise Skip
 
         plots = []
-        for s in series_sel:
-            base = _base_from(s)
-            color = COLOR_BY_BASE.get(base, '#1f77b4')
-            df_s = long[long['Serie']==s]
-            if df_s.empty:
-                continue
-
-            if tipo == "Caja":
-                # Usar by='Mes' (NO pasar x=)
-                g = df_s.hvplot.box(
-                    y='valor', by='Mes',
-                    color=color, width=1000, height=400,
-                    ylabel='Valor', xlabel='Mes', legend=False, tools=['hover']
-                )
-            else:
-                # También by='Mes' en violín
-                g = df_s.hvplot.violin(
-                    y='valor', by='Mes',
-                    color=color, width=1000, height=400,
-                    ylabel='Valor', xlabel='Mes', legend=False, tools=['hover']
-                )
-
-            g = g.opts(hooks=[_pretty_hover], yformatter=NumeralTickFormatter(format="0,0"))
+        for s in present:
+            color = COLOR_BY_BASE.get(_base_from(s), '#1f77b4')
+            g = plot.dmap(partial(_dist_plot, s=s, tipo=tipo, color=color))
             subtitle = pn.pane.Markdown(f"**{s}**", styles={'text-align':'right','margin':'4px 8px 0 0'})
             plots.append(pn.Column(subtitle, g, sizing_mode="stretch_width"))
 
-        if not plots:
-            return pn.pane.Markdown("**Sin datos para las series seleccionadas.**")
-
         return pn.Column(_right_header("4) Distribución mensual — Caja/Violín"), tipo_w, *plots)
 
-    return pn.Column(_view)
\ No newline at end of file
+    return pn.Column(_view)
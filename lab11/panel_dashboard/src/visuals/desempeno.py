@@ -4,7 +4,12 @@ import panel as pn
 import holoviews as hv
 import hvplot.pandas  # noqa
 import param
+from functools import partial
+from param import Skip
+from src.backtest import BACKTEST_MODEL, get_backtest, horizon_curves, horizon_errors
+from src.distributions import residual_distribution
 from src.visuals.real_predicho import MODELS_STATE
+from src.visuals.patch import PatchablePlot
 
 hv.extension("bokeh")
 
@@ -15,11 +20,14 @@ COLOR_REAL         = "#111111"
 COLOR_NAIVE        = "#9E9E9E"
 COLOR_SNAIVE       = "#6E6E6E"
 COLOR_HOLTWINTERS  = "#4B4B4B"
+COLOR_LSTM         = "#2B2B2B"
 
 COLOR_BY_MODEL = {
     "Naive":         COLOR_NAIVE,
     "S-Naive(12)":   COLOR_SNAIVE,
     "Holt-Winters":  COLOR_HOLTWINTERS,
+    "Holt-Winters (NumPy)": COLOR_HOLTWINTERS,
+    "LSTM":          COLOR_LSTM,
 }
 
 # =========================
@@ -39,13 +47,6 @@ PERF_STATE = _PerfState()
 def _right_header(text: str):
     return pn.pane.Markdown(f"### {text}", styles={"text-align":"right","margin":"0 8px 6px 0"})
 
-def _series_scale(df: pd.DataFrame, series_sel) -> float:
-    if not series_sel: return 1.0
-    cols = [c for c in series_sel if c in df.columns]
-    if not cols: return 1.0
-    y = df[cols].astype(float)
-    return float(np.nanmedian(y.std().values)) if not y.empty else 1.0
-
 def _smooth(y: pd.Series, w: int) -> pd.Series:
     if w and w > 1: return y.rolling(window=w, min_periods=1, center=True).mean()
     return y
@@ -53,96 +54,130 @@ def _smooth(y: pd.Series, w: int) -> pd.Series:
 def _cumulative_mean(y: pd.Series) -> pd.Series:
     return y.expanding(min_periods=1).mean()
 
-def _dummy_metric_curves(df, series_sel, model: str, max_h: int = 12, seed_base: int = 123):
-    scale = _series_scale(df, series_sel)
-    seed = (abs(hash(model)) + seed_base) % (2**32 - 1)
-    rng = np.random.default_rng(seed)
-
-    if "Holt" in model: base_rmse, base_mae = 0.75, 0.60
-    elif "S-Naive" in model: base_rmse, base_mae = 0.95, 0.78
-    else: base_rmse, base_mae = 1.05, 0.85
-
-    noise_rmse = rng.normal(0, 0.08, size=max_h) + rng.uniform(-0.05, 0.05, size=max_h)
-    noise_mae  = rng.normal(0, 0.07, size=max_h) + rng.uniform(-0.04, 0.04, size=max_h)
-
-    rmse = np.abs((base_rmse + noise_rmse) * scale)
-    mae  = np.abs((base_mae  + noise_mae ) * scale * 0.85)
-
-    horizons = np.arange(1, max_h + 1, dtype=int)
-    return pd.DataFrame({"h": horizons, "RMSE": rmse, "MAE": mae, "Modelo": model})
-
-def _dummy_residuals_from_metric(df, series_sel, model: str, n: int = 800, seed_base: int = 999):
-    curves = _dummy_metric_curves(df, series_sel, model)
-    rmse_mean = curves["RMSE"].mean() if not curves.empty else 1.0
-    seed = (abs(hash(model)) + seed_base) % (2**32 - 1)
-    rng = np.random.default_rng(seed)
-    resid = rng.normal(0, rmse_mean, size=n)
-    return pd.DataFrame({"residual": resid, "Modelo": model})
+def _perf_curves(store, model: str, series: tuple, i0: int, i1: int):
+    """
+    Curvas RMSE/MAE por horizonte y residuales a 1 paso (todas las series y
+    orígenes del rango) a partir del backtest. Cacheado en el store (se
+    descarta con cada append): los controles de métrica/acumulado/suavizado
+    solo re-estilan estos arrays.
+    """
+    # El backtest va fuera del lock del store: tiene su propia caché
+    bt = get_backtest(store)
+
+    def build():
+        curves = horizon_curves(bt, model, series, i0, i1)
+        err = horizon_errors(bt, model, series, i0, i1)[..., 0].ravel()
+        resid = err[~np.isnan(err)]
+        resid.flags.writeable = False
+        return curves, resid
+    return store.cached(("perf_curves", model, series, i0, i1), build)
+
+def _resid_dist(store, model: str, series: tuple, i0: int, i1: int) -> pd.DataFrame:
+    """Histograma y KDE (densidad) de los residuales a 1 paso; el toggle KDE solo elige capa."""
+    resid = _perf_curves(store, model, series, i0, i1)[1]
+    return store.cached(("resid_dist", model, series, i0, i1), lambda: residual_distribution(resid))
+
+def _perf_lines(data: pd.DataFrame, models: tuple, metric: str) -> hv.Overlay:
+    lines = []
+    for m in models:
+        d = data[data["Modelo"] == m]
+        color = COLOR_BY_MODEL.get(m, COLOR_REAL)
+        line = d.hvplot.line(
+            x="h", y="y", color=color, alpha=0.95, line_width=3, label=m,
+            ylabel=metric, xlabel="Horizonte (pasos)", height=320, width=1000
+        )
+        pts = d.hvplot.scatter(
+            x="h", y="y", color=color, alpha=0.9, size=5, legend=False
+        )
+        lines.append(line * pts)
+    return hv.Overlay(lines)
+
+def _resid_plot(data: pd.DataFrame, use_kde: bool, m: str):
+    """
+    Histograma + KDE precalculados de un modelo en la misma figura; el toggle
+    solo cambia qué capa es visible (ambas en densidad, mismo eje y).
+    """
+    r = data[data["Modelo"] == m]
+    color = COLOR_BY_MODEL.get(m, COLOR_REAL)
+    h = r[r["capa"] == "hist"]
+    hist = hv.Histogram((h["x"].to_numpy(), h["y"].to_numpy()), kdims="x", vdims="y").opts(
+        color=color, alpha=0.65, line_color=None, visible=not use_kde)
+    kde = hv.Curve(r[r["capa"] == "kde"], "x", "y").opts(color=color, line_width=2, visible=use_kde)
+    return (hist * kde).opts(
+        ylabel="Densidad", xlabel="Residual", height=220, width=1000, title=f"Residual — {m}",
+        show_legend=False
+    )
 
 # =========================
 # Vista
 # =========================
-def desempeno_view(df: pd.DataFrame, series_w, range_w):
+def desempeno_view(sel):
     metric_w = pn.widgets.RadioButtonGroup.from_param(PERF_STATE.param.metric)
     acumulado_w = pn.widgets.Toggle.from_param(PERF_STATE.param.accumulated)
     smooth_w = pn.widgets.IntSlider.from_param(PERF_STATE.param.smoothing, start=0, end=6, step=1)
     densidad_w = pn.widgets.Toggle.from_param(PERF_STATE.param.use_kde)
 
+    # Figuras persistentes: rango/acumulado/suavizado solo parchean los datos
+    curves_plot, resid_plot = PatchablePlot(), PatchablePlot()
+    # El toggle KDE es un stream de las figuras de residuales (uno por vista): no re-ejecuta _view
+    kde_stream = hv.streams.Params(PERF_STATE, ["use_kde"])
+
     @pn.depends(
-        series_w.param.value,
-        range_w.param.value_throttled,
+        sel.param.frame,
         MODELS_STATE.param.selected,      # <- modelos chequeados en real_predicho
         PERF_STATE.param.metric,
         PERF_STATE.param.accumulated,
         PERF_STATE.param.smoothing,
-        PERF_STATE.param.use_kde
     )
-    def _view(series_sel, drange, models_sel, metric, acumulado, smooth, use_kde):
-        models = [m for m in models_sel if m in COLOR_BY_MODEL]
+    def _view(x, models_sel, metric, acumulado, smooth):
+        series_sel = sel.series
+        # LSTM solo si el backtest viene del artefacto precalculado
+        bt_models = get_backtest(sel.store)["models"]
+        models = [m for m in models_sel if m in COLOR_BY_MODEL and BACKTEST_MODEL[m] in bt_models]
         if not models:
+            curves_plot.reset(); resid_plot.reset()
             return pn.pane.Markdown("**Marca al menos un modelo en _Real vs Predicho_**.")
 
+        if not series_sel:
+            curves_plot.reset(); resid_plot.reset()
+            return pn.pane.Markdown("**Selecciona al menos una serie.**")
+
         # (a) Curva única de RMSE/MAE con múltiples líneas (una por modelo)
-        x = df.copy()
-        if "fecha" in x.columns:
-            x["fecha"] = pd.to_datetime(x["fecha"])
-            x = x.loc[(x["fecha"] >= pd.to_datetime(drange[0])) & (x["fecha"] <= pd.to_datetime(drange[1]))]
+        i0, i1 = sel.bounds
+        perf = {m: _perf_curves(sel.store, m, tuple(series_sel), i0, i1) for m in models}
 
-        lines = []
+        curves = []
         for m in models:
-            curves = _dummy_metric_curves(x, series_sel, m, max_h=12)
-            y = curves[metric]
+            c = perf[m][0]
+            y = c[metric]
             if acumulado: y = _cumulative_mean(y)
             y = _smooth(y, smooth)
-            color = COLOR_BY_MODEL.get(m, COLOR_REAL)
+            curves.append(c[["h", "Modelo"]].assign(y=y.values))
+
+        # (b) Histograma/KDE de residuales a 1 paso, cacheados por modelo y selección
+        with_resid = tuple(m for m in models if len(perf[m][1]))
+        resid = pd.concat(
+            [_resid_dist(sel.store, m, tuple(series_sel), i0, i1).assign(Modelo=m) for m in with_resid]
+            or [pd.DataFrame({"capa": [], "x": [], "y": [], "Modelo": []})],
+            ignore_index=True,
+        )
 
-            line = curves.assign(y=y.values).hvplot.line(
-                x="h", y="y", color=color, alpha=0.95, line_width=3, label=m,
-                ylabel=metric, xlabel="Horizonte (pasos)", height=320, width=1000
-            )
-            pts = curves.assign(y=y.values).hvplot.scatter(
-                x="h", y="y", color=color, alpha=0.9, size=5, legend=False
-            )
-            lines.append(line * pts)
+        patched_curves = curves_plot.show((tuple(models), metric), pd.concat(curves, ignore_index=True))
+        patched_resid = resid_plot.show((tuple(models), with_resid), resid)
+        if patched_curves and patched_resid:
+            raise Skip
 
-        rmse_overlay = hv.Overlay(lines).opts(show_legend=True, legend_position="top_left")
+        rmse_overlay = curves_plot.dmap(partial(_perf_lines, models=tuple(models), metric=metric)).opts(
+            show_legend=True, legend_position="top_left")
         rmse_panel = pn.pane.HoloViews(rmse_overlay, sizing_mode="stretch_width")
 
-        # (b) Residuales: una gráfica por modelo, colocadas una DEBAJO de la otra
+        # Residuales: una gráfica por modelo, colocadas una DEBAJO de la otra
         resid_panels = []
         for m in models:
-            r = _dummy_residuals_from_metric(x, series_sel, m, n=1000)
-            color = COLOR_BY_MODEL.get(m, COLOR_REAL)
-            if use_kde:
-                g = r.hvplot.kde(
-                    y="residual", color=color, alpha=0.85, legend=False,
-                    ylabel="Densidad", xlabel="Residual", height=220, width=1000, title=f"Residual — {m}"
-                )
-            else:
-                g = r.hvplot.hist(
-                    y="residual", bins=40, color=color, alpha=0.65, legend=False,
-                    ylabel="Frecuencia", xlabel="Residual", height=220, width=1000, title=f"Residual — {m}"
-                )
+            if m not in with_resid:
+                resid_panels.append(pn.pane.Markdown(f"_Sin residuales para {m} en el rango seleccionado._"))
+                continue
+            g = hv.DynamicMap(partial(_resid_plot, m=m), streams=[resid_plot.buffer, kde_stream])
             resid_panels.append(pn.pane.HoloViews(g, sizing_mode="stretch_width"))
 
         header = _right_header("7) Curvas de desempeño y residuales (modelos)")
@@ -160,4 +195,4 @@ def desempeno_view(df: pd.DataFrame, series_w, range_w):
 
         return pn.Column(header, controls, rmse_panel, resid_col, sizing_mode="stretch_width")
 
-    return pn.Column(_view)
\ No newline at end of file
+    return pn.Column(_view)
@@ -1,13 +1,8 @@
 # src/visuals/estacionalidad.py
 import pandas as pd
-import numpy as np
 import panel as pn
-import holoviews as hv
-import hvplot.pandas
-from bokeh.models import NumeralTickFormatter, HoverTool
-from holoviews import Cycle
-
-hv.extension("bokeh")
+from param import Skip
+from src.visuals.shared_source import SharedSourceLines
 
 # Paleta consistente con el resto
 COLOR_BY_BASE = {
@@ -36,95 +31,37 @@ def _style_for(colname: str):
     dash  = 'dashed' if suf.lower().startswith('con') else 'solid'
     return color, dash
 
-def _legend_tweak(plot, element):
-    fig = plot.state
-    if getattr(fig, "legend", None):
-        lg = fig.legend[0]
-        lg.location = "top_left"
-        lg.title = "Variable"
-        lg.background_fill_alpha = 0.85
-        lg.border_line_color = "lightgray"
-        lg.spacing = 2
-        lg.label_text_font_size = "10pt"
-        lg.title_text_font_style = "bold"
-
-def _ensure_fecha(df: pd.DataFrame) -> pd.Series:
-    """Devuelve una Serie datetime llamada 'fecha' (desde columna o índice)."""
-    if 'fecha' in df.columns:
-        f = pd.to_datetime(df['fecha'])
-    else:
-        f = pd.to_datetime(df.index)
-    return f.rename('fecha')
-
-def _pretty_hover(plot, element):
-    """Hover con fecha legible y separador de miles."""
-    fig = plot.state
-    for t in fig.tools:
-        if isinstance(t, HoverTool):
-            t.tooltips = [
-                ("fecha", "@fecha{%F}"),
-                ("valor", "$y{0,0}")
-            ]
-            t.formatters = {"@fecha": "datetime"}
-            t.mode = "vline"
-            t.point_policy = "snap_to_data"
-
-def estacionalidad_view(df: pd.DataFrame, series_w, range_w):
+def estacionalidad_view(sel):
     """
     Línea + puntos (superpuestos) para todas las series seleccionadas
     en un solo gráfico, filtrado por el DateRangeSlider.
     """
-    @pn.depends(series_w.param.value, range_w.param.value_throttled)
-    def _view(series_sel, drange):
+    # Figura persistente con una sola fuente: un cambio de rango solo parchea los datos
+    plot = SharedSourceLines()
+
+    @pn.depends(sel.param.frame)
+    def _view(frame):
+        series_sel = sel.series
         if not series_sel:
+            plot.reset()
             return pn.pane.Markdown("**Selecciona al menos una serie.**")
 
-        # Asegurar columna 'fecha' y filtrar por rango
-        f = _ensure_fecha(df)
-        x = df.copy()
-        x = x.assign(fecha=f)
-        mask = (x['fecha'] >= pd.to_datetime(drange[0])) & (x['fecha'] <= pd.to_datetime(drange[1]))
-        sub = x.loc[mask, ['fecha'] + list(series_sel)].dropna(how='all')
+        # Corte ya calculado por la Selection (series + rango)
+        sub = frame.reset_index().dropna(how='all')
 
         if sub.empty:
+            plot.reset()
             return pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
 
-        curves = []
-        scatters = []
-        for col in series_sel:
-            if col not in sub.columns:
-                continue
-            color, dash = _style_for(col)
-
-            c = sub.hvplot(
-                x='fecha', y=col, kind='line',
-                color=color, line_dash=dash, line_width=2,
-                height=400, width=1200,
-                label=col,
-                tools=['hover']
-            )
-            p = sub.hvplot.scatter(
-                x='fecha', y=col,
-                color=color, size=4, alpha=0.85,
-                legend=False, tools=['hover']
-            )
-            curves.append(c)
-            scatters.append(p)
+        cols = [c for c in series_sel if c in sub.columns]
+        if plot.show(tuple(cols), sub[['fecha'] + cols]):
+            raise Skip
 
-        chart = (hv.Overlay(curves) * hv.Overlay(scatters)).opts(
-            width=1000, height=400,
-            ylabel='Valor',
-            yticks=6,
-            yformatter=NumeralTickFormatter(format="0,0"),
-            show_legend=True,
-            legend_position='top_left',
-            legend_muted=False,
-            hooks=[_pretty_hover, _legend_tweak],
-        )
+        chart = plot.figure(cols, _style_for, ylabel='Valor')
 
         return pn.Column(
             _right_header("2) Estacionalidad Mes x Año"),
-            pn.pane.HoloViews(chart, width=1000, height=400, sizing_mode='fixed')
+            pn.pane.Bokeh(chart, width=1000, height=400, sizing_mode='fixed')
         )
 
     return pn.Column(_view)
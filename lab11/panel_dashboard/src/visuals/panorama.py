@@ -1,30 +1,9 @@
 # src/visuals/panorama.py
-import panel as pn, holoviews as hv
-import hvplot.pandas
-from bokeh.models import RangeTool, BoxAnnotation, NumeralTickFormatter, HoverTool
+import panel as pn
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
-
-def _pretty_hover(plot, element):
-    from bokeh.models import HoverTool
-    fig = plot.state
-
-    for r in fig.renderers:
-        try:
-            if getattr(r, "legend_label", None) and not getattr(r, "name", None):
-                r.name = r.legend_label
-        except Exception:
-            pass
-
-    for t in fig.tools:
-        if isinstance(t, HoverTool):
-            t.tooltips = [
-                ("fecha", "@fecha{%F}"),
-                ("valor", "$y{0,0}")
-            ]
-            t.formatters = {"@fecha": "datetime"}
-            t.mode = "vline"
-            t.point_policy = "snap_to_data"
+from param import Skip
+from src.visuals.shared_source import SharedSourceLines
 
 COLOR_BY_BASE = {
     'Regular': '#1f77b4',
@@ -41,18 +20,6 @@ def _style_for(colname: str):
     dash  = 'dashed' if suf.lower().startswith('con') else 'solid'
     return color, dash
 
-def _legend_tweak(plot, element):
-    fig = plot.state
-    if getattr(fig, "legend", None):
-        lg = fig.legend[0]
-        lg.location = "top_left"
-        lg.title = "Variable"
-        lg.background_fill_alpha = 0.85
-        lg.border_line_color = "lightgray"
-        lg.spacing = 2
-        lg.label_text_font_size = "10pt"
-        lg.title_text_font_style = "bold"
-
 # Widgets auxiliares
 def series_selector(df: pd.DataFrame):
     """Checkbox de series numéricas (excluye 'fecha')."""
@@ -88,83 +55,53 @@ def _right_header(text: str):
     # título fuera del plot, alineado a la derecha
     return pn.pane.Markdown(f"### {text}", styles={'text-align': 'right', 'margin': '0 8px 6px 0'})
 
-# Helpers de transformación
-def _resample(df: pd.DataFrame, freq_label: str) -> pd.DataFrame:
-    """Resample por suma (cambia a .mean() si lo prefieres)."""
-    rule = {"Mensual":"MS", "Trimestral":"QS", "Anual":"AS"}[freq_label]
-    x = df.copy()
-    if 'fecha' in x.columns:
-        x['fecha'] = pd.to_datetime(x['fecha'])
-        x = x.set_index('fecha')
-    # suma por periodo
-    x = x.resample(rule).sum()
-    x = x.reset_index()  # recupera 'fecha'
-    return x
-
-def _apply_epoch(df: pd.DataFrame, epoch_sel: str) -> pd.DataFrame:
-    """Filtra por Todo / Pre-2020 / Post-2020 asegurando columna 'fecha'."""
-    x = df.copy()
-    if 'fecha' not in x.columns:
-        x = x.reset_index().rename(columns={'index':'fecha'})
-    x['fecha'] = pd.to_datetime(x['fecha'])
-    if epoch_sel == "Pre-2020":
-        x = x[x['fecha'] < pd.Timestamp('2020-01-01')]
-    elif epoch_sel == "Post-2020":
-        x = x[x['fecha'] >= pd.Timestamp('2020-01-01')]
-    return x
-
 # Vista principal
-def panorama_view(df: pd.DataFrame, series_w, range_w, freq_w, epoch_w):
-    @pn.depends(series_w.param.value, range_w.param.value_throttled,
-                freq_w.param.value, epoch_w.param.value)
-    def _view(series_sel, dr, freq_label, epoch_sel):
+def _tail_rows(agg: pd.DataFrame, series_sel, last, end) -> pd.DataFrame | None:
+    """
+    Filas del agregado posteriores a `last` (hasta `end`). None si el último
+    periodo ya enviado cambió (trimestre/año parcial): hay que reenviar todo.
+    """
+    i_last = int(agg.index.searchsorted(last, side="left"))
+    if i_last >= len(agg) or agg.index[i_last] != last:
+        return None
+    return agg.iloc[i_last + 1:int(agg.index.searchsorted(end, side="right"))][list(series_sel)].reset_index()
+
+def panorama_view(sel, freq_w, epoch_w):
+    # Figura persistente de la sesión con una sola fuente (fecha + series
+    # seleccionadas): rango/append solo parchean sus datos
+    plot = SharedSourceLines()
+
+    @pn.depends(sel.param.frame, freq_w.param.value, epoch_w.param.value)
+    def _view(_frame, freq_label, epoch_sel):
+        series_sel = sel.series
         if not series_sel:
+            plot.reset()
             return pn.pane.Markdown("**Selecciona al menos una serie.**")
 
-        # Filtrado por corte temporal
-        base = _apply_epoch(df, epoch_sel)
-
-        # Resample (MS/QS/AS)
-        agg = _resample(base, freq_label)  # tiene 'fecha' como columna
-
-        # Rango del slider
-        mask = (agg['fecha'] >= pd.to_datetime(dr[0])) & (agg['fecha'] <= pd.to_datetime(dr[1]))
-        sub  = agg.loc[mask, ['fecha'] + list(series_sel)]
-
-        # Plot principal
-        curves, scatters = [], []
-        for col in series_sel:
-            if col not in sub.columns:
-                continue
-            color, dash = _style_for(col)
-
-            c = sub.hvplot(
-                x='fecha', y=col, kind='line',
-                color=color, line_dash=dash, line_width=2,
-                height=400, width=1000,
-                label=col, tools=['hover']
-            )
-            p = sub.hvplot.scatter(
-                x='fecha', y=col,
-                color=color, size=4, alpha=0.85,
-                legend=False, tools=['hover']
-            )
-            curves.append(c); scatters.append(p)
-
-        main = (hv.Overlay(curves) * hv.Overlay(scatters)).opts(
-            width=1000, height=400,
-            ylabel='Importación',
-            yticks=6,
-            yformatter=NumeralTickFormatter(format="0,0"),
-            show_legend=True,
-            legend_position='top_left',
-            legend_muted=False,
-            hooks=[_pretty_hover, _legend_tweak],
-        )
+        # Agregado (MS/QS/YS) ya precalculado para el corte temporal
+        agg = sel.store.pyramid(epoch_sel)[freq_label]
+        cols = [c for c in series_sel if c in agg.columns]
+        key = (freq_label, epoch_sel, tuple(cols))
+
+        # Append del modo live en mensual: solo los meses nuevos
+        if sel.delta_for(_frame) is not None and plot.key == key and freq_label == "Mensual" and len(plot.data):
+            rows = _tail_rows(agg, cols, plot.data["fecha"].iloc[-1], sel.end)
+            if rows is not None:
+                plot.append(rows)
+                raise Skip
+
+        # Rango del slider (searchsorted sobre el índice ordenado)
+        i0, i1 = sel.positions(sel.start, sel.end, agg.index)
+        sub  = agg.iloc[i0:i1][cols].reset_index()  # recupera 'fecha'
+        if plot.show(key, sub):
+            raise Skip
+
+        # Línea + puntos por serie, todos sobre la misma ColumnDataSource
+        main = plot.figure(cols, _style_for, ylabel='Importación')
 
         return pn.Column(
             _right_header("1) Panorama temporal"),
-            pn.pane.HoloViews(main, width=1000, height=400, sizing_mode='fixed')
+            pn.pane.Bokeh(main, width=1000, height=400, sizing_mode='fixed')
         )
 
     return pn.Column(_view)
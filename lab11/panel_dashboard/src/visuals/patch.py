@@ -0,0 +1,76 @@
+# src/visuals/patch.py
+"""
+Gráficas persistentes para las vistas.
+
+La figura Bokeh (herramientas, hooks, leyenda) se construye una sola vez por
+"estructura" (series, frecuencia, modelos...). Mientras la estructura no
+cambie, un cambio de rango solo reemplaza los datos del Buffer y Bokeh parchea
+las ColumnDataSource existentes; la vista lanza `Skip` y Panel no toca el
+layout. Los appends del modo live se envían como deltas (Buffer.send).
+Con `downsample_width` el DynamicMap suma un stream RangeX y cada render
+reduce las series largas a ~2x ese ancho (src/downsample.py); con
+`downsample_by` solo esas columnas eligen los puntos.
+
+    plot = PatchablePlot()
+    ...
+    if plot.show(key, data):
+        raise Skip
+    dmap = plot.dmap(lambda data: hv.Curve(data, "fecha", "valor"))
+"""
+import holoviews as hv
+import pandas as pd
+from holoviews.core.util import disable_constant
+from src.downsample import POINTS_PER_PIXEL, downsample_view
+
+BUFFER_LENGTH = 1_000_000   # el Buffer nunca recorta la historia
+
+def replace_data(buf: hv.streams.Buffer, data: pd.DataFrame) -> None:
+    """Reemplaza todo el contenido de un Buffer en un solo evento (sin stream parcial)."""
+    with disable_constant(buf):
+        buf.data = data
+    hv.streams.Stream.trigger([buf])
+
+class PatchablePlot:
+    """Buffer de datos + DynamicMaps persistentes de una vista, por clave de estructura."""
+
+    def __init__(self):
+        self.key = None
+        self.buffer = None
+
+    def show(self, key, data: pd.DataFrame) -> bool:
+        """
+        True si la figura vigente tiene la misma estructura y solo se
+        reemplazaron sus datos; False si hay que construirla (con `dmap`).
+        """
+        if self.buffer is not None and key == self.key:
+            replace_data(self.buffer, data)
+            return True
+        self.key = key
+        self.buffer = hv.streams.Buffer(data, length=BUFFER_LENGTH, index=False)
+        return False
+
+    def dmap(self, render, downsample_width: int | None = None, downsample_by=None) -> hv.DynamicMap:
+        """DynamicMap render(data) alimentado por el Buffer vigente."""
+        if downsample_width is None:
+            return hv.DynamicMap(render, streams=[self.buffer])
+        n = POINTS_PER_PIXEL * downsample_width
+
+        def _render(data, x_range):
+            # Sin reducción `data` es el frame del Buffer y los appends siguen siendo deltas
+            return render(downsample_view(data, n, *(x_range or (None, None)), by=downsample_by))
+
+        return hv.DynamicMap(_render, streams=[self.buffer, hv.streams.RangeX()])
+
+    def append(self, rows: pd.DataFrame) -> None:
+        """Agrega filas al final (delta por websocket)."""
+        if not rows.empty:
+            self.buffer.send(rows)
+
+    @property
+    def data(self) -> pd.DataFrame | None:
+        return None if self.buffer is None else self.buffer.data
+
+    def reset(self) -> None:
+        """La vista mostró otra cosa (mensaje, error): la próxima vez se reconstruye."""
+        self.key = None
+        self.buffer = None
@@ -1,4 +1,10 @@
 # src/visuals/real_predicho.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from functools import partial
+from pathlib import Path
 import pandas as pd
 import numpy as np
 import panel as pn
@@ -6,6 +12,12 @@ import holoviews as hv
 import hvplot.pandas
 from bokeh.models import HoverTool, NumeralTickFormatter
 import param
+from src.artifacts import load_artifact
+from src.fit_cache import FitCache
+from src.models import HAS_SM as _HAS_SM, fit_holt_winters
+from src.hw_numpy import fit_holt_winters_batch
+from src.lstm_numpy import load_lstm
+from src.visuals.patch import PatchablePlot
 
 hv.extension("bokeh")
 
@@ -16,20 +28,26 @@ MODELS_STATE = _ModelsState()
 
 COLOR_BY_BASE = {'Regular': '#1f77b4', 'Superior': '#ff7f0e', 'Diesel': '#2ca02c'}
 
-try:
-    from statsmodels.tsa.holtwinters import ExponentialSmoothing
-    _HAS_SM = True
-except Exception:
-    _HAS_SM = False
+# Ajustes de Holt-Winters compartidos por todas las sesiones del proceso.
+# Se persisten en panel_dashboard/.cache/fits (FIT_CACHE_DIR="" lo desactiva).
+_FIT_CACHE_DIR = os.environ.get("FIT_CACHE_DIR", str(Path(__file__).resolve().parents[2] / ".cache" / "fits"))
+HW_CACHE = FitCache(maxsize=256, persist_dir=_FIT_CACHE_DIR or None)
+
+# Pool de procesos para ajustar fuera del callback de Panel (FIT_WORKERS=0 -> síncrono).
+# Con "spawn": un fork copiaría el server (hilos de Tornado, sesiones, locks
+# tomados) y puede bloquearse; así cada worker es un proceso nuevo sin ese estado.
+_FIT_WORKERS = int(os.environ.get("FIT_WORKERS", min(4, os.cpu_count() or 1)))
+_FIT_POOL = None
+
+def _fit_pool():
+    global _FIT_POOL
+    if _FIT_POOL is None and _FIT_WORKERS > 0:
+        _FIT_POOL = ProcessPoolExecutor(max_workers=_FIT_WORKERS, mp_context=get_context("spawn"))
+    return _FIT_POOL
 
 def _right_header(text: str):
     return pn.pane.Markdown(f"### {text}", styles={'text-align':'right','margin':'0 8px 6px 0'})
 
-def _ensure_fecha(df: pd.DataFrame) -> pd.Series:
-    if 'fecha' in df.columns: f = pd.to_datetime(df['fecha'])
-    else: f = pd.to_datetime(df.index)
-    return f.rename('fecha')
-
 def _pretty_hover(plot, element):
     fig = plot.state
     for t in fig.tools:
@@ -49,15 +67,157 @@ def _sn12(arr: pd.Series, m=12) -> pd.Series:
 def _naive(arr: pd.Series) -> pd.Series:
     return arr.shift(1)
 
-def _holt_winters(arr: pd.Series, seasonal_periods=12) -> pd.Series:
-    # Devuelve in-sample fitted values alineadas con el índice
-    model = ExponentialSmoothing(arr, trend='add', seasonal='add', seasonal_periods=seasonal_periods, initialization_method="estimated")
-    res = model.fit(optimized=True)
-    return pd.Series(res.fittedvalues, index=arr.index)
+# Columnas por serie en el frame ancho que alimenta la gráfica
+_LINES = [
+    # (sufijo, modelo que la activa, etiqueta, estilo)
+    ("naive", "Naive", "Naive", dict(line_dash='dashed', alpha=0.9)),
+    ("snaive", "S-Naive(12)", "S-Naive(12)", dict(line_dash='dotted', alpha=0.9)),
+    ("hw", "Holt-Winters", "Holt-Winters", dict(line_dash='dotdash', alpha=0.95)),
+    ("hwnp", "Holt-Winters (NumPy)", "Holt-Winters (NumPy)", dict(line_dash='dashdot', alpha=0.95)),
+    ("lstm", "LSTM", "LSTM", dict(line_dash='10 4', alpha=0.95)),
+]
+
+def _wide_frame(x: pd.DataFrame, present, hw_fits: dict, np_fits: dict,
+                lstm_fit: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Real y ajustes (Naive, S-Naive, Holt-Winters, LSTM) de cada serie como
+    columnas '<serie>__<sufijo>' sobre las fechas del corte; NaN donde no hay ajuste.
+    """
+    out = {"fecha": x.index}
+    for s in present:
+        ser = x[s].dropna()
+        out[f"{s}__real"] = x[s].to_numpy()
+        out[f"{s}__naive"] = _naive(ser).reindex(x.index).to_numpy()
+        out[f"{s}__snaive"] = _sn12(ser, 12).reindex(x.index).to_numpy()
+        for suf, fits in (("hw", hw_fits), ("hwnp", np_fits)):
+            out[f"{s}__{suf}"] = fits[s].reindex(x.index).to_numpy() if s in fits else np.full(len(x), np.nan)
+        has_lstm = lstm_fit is not None and s in lstm_fit.columns
+        out[f"{s}__lstm"] = lstm_fit[s].reindex(x.index).to_numpy() if has_lstm else np.full(len(x), np.nan)
+    return pd.DataFrame(out)
+
+def _lstm_fitted(store) -> pd.DataFrame | None:
+    """
+    Predicción a 1 paso del LSTM (kernel NumPy) para toda la historia del
+    store, calculada una vez por versión de datos (o leída del artefacto
+    precalculado); la vista solo la rebana.
+    """
+    lstm = load_lstm()
+    if lstm is None:
+        return None
+    art = load_artifact(store.version)
+    if art is not None and art.fitted("LSTM") is not None:
+        return art.fitted("LSTM")
+    return store.cached(("lstm_fitted",), lambda: lstm.fitted(store.df))
+
+def _seed_from_artifact(store) -> int:
+    """
+    Carga en HW_CACHE (solo memoria) los ajustes Holt-Winters de toda la
+    historia del artefacto de la versión: con el rango completo la vista no
+    ajusta nada. Devuelve cuántos ajustes sembró.
+    """
+    art = load_artifact(store.version)
+    if art is None:
+        return 0
+    n = 0
+    for model in ("Holt-Winters", "Holt-Winters (NumPy)"):
+        fitted = art.fitted(model)
+        if fitted is None:
+            continue
+        for i, s in enumerate(art.series):
+            params = art.fitted_params[model][i]
+            ser = store.df[s].dropna()
+            if params is None or ser.empty:
+                continue
+            key = (model,) + _hw_key(ser, 12, store.version)[1:]
+            HW_CACHE.put(key, {"fitted": fitted[s].to_numpy()[store.df[s].notna().to_numpy()], "params": params},
+                         persist=False)
+            n += 1
+    return n
+
+def _lines(data: pd.DataFrame, present, modelos_sel) -> hv.Overlay:
+    """Real (sólida) + predicciones in-sample (punteadas) por serie, desde el Buffer."""
+    lines = []
+    for s in present:
+        color = COLOR_BY_BASE.get(_base_from(s), '#1f77b4')
+        lines.append(hv.Curve(data, "fecha", (f"{s}__real", "Valor"), label=f"{s} (Real)").opts(
+            color=color, line_width=2, tools=['hover'], hooks=[_pretty_hover]))
+        for suf, modelo, etiqueta, style in _LINES:
+            if modelo in modelos_sel:
+                lines.append(hv.Curve(data, "fecha", (f"{s}__{suf}", "Valor"), label=f"{s} — {etiqueta}").opts(
+                    color=color, **style))
+    return hv.Overlay(lines)
+
+def _hw_key(arr: pd.Series, seasonal_periods: int, version: str) -> tuple:
+    # Serie, rango efectivo, periodo estacional y versión de los datos
+    return ("Holt-Winters", arr.name, str(arr.index[0]), str(arr.index[-1]), seasonal_periods, version)
 
-def real_predicho_view(df: pd.DataFrame, series_w, range_w):
+def _holt_winters(arr: pd.Series, seasonal_periods=12, version: str = "") -> pd.Series:
+    # Devuelve in-sample fitted values alineadas con el índice (ajuste síncrono)
+    key = _hw_key(arr, seasonal_periods, version)
+    fit = HW_CACHE.get_or_fit(key, lambda: fit_holt_winters(arr.to_numpy(), seasonal_periods))
+    return pd.Series(fit["fitted"], index=arr.index)
+
+def _holt_winters_numpy(x: pd.DataFrame, series, seasonal_periods: int, version: str) -> dict:
+    """
+    Holt-Winters del motor NumPy: ajusta de una vez (matriz series x tiempo)
+    todas las series sin ajuste cacheado y devuelve {serie: fitted}.
+    """
+    out, missing = {}, []
+    for s in series:
+        ser = x[s].dropna()
+        if len(ser) < 2 * seasonal_periods: continue
+        key = ("Holt-Winters (NumPy)",) + _hw_key(ser, seasonal_periods, version)[1:]
+        fit = HW_CACHE.get(key)
+        if fit is None:
+            missing.append((s, ser, key))
+        else:
+            out[s] = pd.Series(fit["fitted"], index=ser.index)
+    if missing:
+        Y = x[[s for s, _, _ in missing]].to_numpy(dtype="float64").T
+        res = fit_holt_winters_batch(Y, seasonal_periods)
+        for i, (s, ser, key) in enumerate(missing):
+            valid = ~np.isnan(Y[i])
+            fitted = res["fitted"][i][valid]
+            params = {k: float(res[k][i]) for k in ("alpha", "beta", "gamma", "sse", "level0", "trend0")}
+            params["season0"] = res["season0"][i].tolist()
+            HW_CACHE.put(key, {"fitted": fitted, "params": params})
+            out[s] = pd.Series(fitted, index=ser.index)
+    return out
+
+async def _holt_winters_many(series: dict[str, pd.Series], seasonal_periods: int, version: str) -> dict:
+    """
+    Ajusta en el pool las series sin ajuste cacheado y devuelve {serie: fitted}.
+    Si la tarea se cancela (el usuario movió el slider), cancela los ajustes pendientes.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _fit_pool()
+    futures = {
+        s: loop.run_in_executor(pool, fit_holt_winters, ser.to_numpy(), seasonal_periods)
+        for s, ser in series.items()
+    }
+    try:
+        results = await asyncio.gather(*futures.values(), return_exceptions=True)
+    except asyncio.CancelledError:
+        for fut in futures.values():
+            fut.cancel()
+        raise
+    out = {}
+    for (s, ser), fit in zip(series.items(), results):
+        if isinstance(fit, BaseException):
+            continue
+        HW_CACHE.put(_hw_key(ser, seasonal_periods, version), fit)
+        out[s] = pd.Series(fit["fitted"], index=ser.index)
+    return out
+
+def real_predicho_view(sel):
     modelos = ["Naive","S-Naive(12)"]
     if _HAS_SM: modelos.append("Holt-Winters")
+    modelos.append("Holt-Winters (NumPy)")
+    if load_lstm() is not None: modelos.append("LSTM")
+
+    # Una vez por versión de datos y artefacto: ajustes precalculados -> caché de ajustes
+    art = load_artifact(sel.store.version)
+    sel.store.cached(("hw_seed", art.stamp if art else None), lambda: _seed_from_artifact(sel.store))
 
     model_w = pn.widgets.CheckBoxGroup(name="Modelos", options=modelos, value=["Naive"])
     MODELS_STATE.selected = list(model_w.value)
@@ -67,54 +227,94 @@ def real_predicho_view(df: pd.DataFrame, series_w, range_w):
         # Mantén sincronizado el estado compartido con las checkboxes
         MODELS_STATE.selected = list(models)
 
-    @pn.depends(series_w.param.value, range_w.param.value_throttled, model_w.param.value)
-    def _view(series_sel, dr, modelos_sel):
-        if not series_sel:
-            return pn.pane.Markdown("**Selecciona al menos una serie.**")
+    # Figura persistente por (series, modelos): rango, ajustes y appends solo parchean datos
+    plot = PatchablePlot()
+    nota = pn.pane.Markdown("", visible=False)
+
+    def _show(x, present, modelos_sel, hw_fits, np_fits, lstm_fit, pending):
+        """Layout nuevo, o None si bastó con parchear la figura vigente."""
+        nota.object = f"_Ajustando Holt-Winters: {', '.join(pending)}…_" if pending else ""
+        nota.visible = bool(pending)
+        if plot.show((present, tuple(modelos_sel)), _wide_frame(x, present, hw_fits, np_fits, lstm_fit)):
+            return None
 
-        f = _ensure_fecha(df)
-        x = df.assign(fecha=f).loc[(f>=pd.to_datetime(dr[0])) & (f<=pd.to_datetime(dr[1]))]
-        if x.empty: return pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
+        # La reducción la decide la serie real; los ajustes usan las mismas fechas
+        chart = plot.dmap(partial(_lines, present=present, modelos_sel=tuple(modelos_sel)),
+                          downsample_width=1000, downsample_by=[f"{s}__real" for s in present]).opts(
+            width=1000, height=400,
+            ylabel="Valor", yticks=6, yformatter=NumeralTickFormatter(format="0,0"),
+            show_legend=True, legend_position='top_left'
+        )
+        return pn.Column(_right_header("6) Real vs Predicho"), model_w, nota,
+                         pn.pane.HoloViews(chart, width=1000, height=400, sizing_mode='fixed'))
+
+    @pn.depends(sel.param.frame, model_w.param.value)
+    async def _view(x, modelos_sel):
+        series_sel = sel.series
+        if not series_sel:
+            plot.reset()
+            yield pn.pane.Markdown("**Selecciona al menos una serie.**")
+            return
 
-        overlays = []
-        for s in series_sel:
-            if s not in x.columns: continue
-            base = _base_from(s); color = COLOR_BY_BASE.get(base, '#1f77b4')
-            ser = x.set_index('fecha')[s].astype(float).dropna()
+        if x.empty:
+            plot.reset()
+            yield pn.pane.Markdown("**No hay datos en el rango seleccionado.**")
+            return
 
-            if ser.empty: continue
+        present = tuple(s for s in series_sel if x[s].notna().any())
+        if not present:
+            plot.reset()
+            yield pn.pane.Markdown("**No hay datos modelables para las series seleccionadas.**")
+            return
 
-            # Real
-            real_line = ser.hvplot.line(width=1000, height=400, color=color, line_width=2, label=f"{s} (Real)",
-                                        tools=['hover']).opts(hooks=[_pretty_hover])
-            series_ol = real_line
+        # LSTM (NumPy): una pasada por versión de datos, sin TensorFlow
+        lstm_fit = _lstm_fitted(sel.store) if "LSTM" in modelos_sel else None
 
-            # Predicciones in-sample (fitted) como líneas punteadas
-            if "Naive" in modelos_sel:
-                yhat = _naive(ser)
-                series_ol *= yhat.hvplot.line(color=color, line_dash='dashed', alpha=0.9, label=f"{s} — Naive")
+        # Append del modo live: solo los meses nuevos (Real/Naive/S-Naive/LSTM).
+        # Holt-Winters conserva su ajuste hasta el próximo cambio de rango.
+        if (sel.delta_for(x) is not None and plot.key == (present, tuple(modelos_sel))
+                and not nota.visible and len(plot.data)):
+            rows = _wide_frame(x, present, {}, {}, lstm_fit)
+            plot.append(rows[rows["fecha"] > plot.data["fecha"].iloc[-1]])
+            return
 
-            if "S-Naive(12)" in modelos_sel:
-                yhat = _sn12(ser, 12)
-                series_ol *= yhat.hvplot.line(color=color, line_dash='dotted', alpha=0.9, label=f"{s} — S-Naive(12)")
+        # Holt-Winters: lo cacheado se pinta ya; el resto se ajusta en segundo plano
+        hw_fits, to_fit = {}, {}
+        if "Holt-Winters" in modelos_sel and _HAS_SM:
+            for s in series_sel:
+                ser = x[s].dropna()
+                if ser.empty: continue
+                fit = HW_CACHE.get(_hw_key(ser, 12, sel.store.version))
+                if fit is not None:
+                    hw_fits[s] = pd.Series(fit["fitted"], index=ser.index)
+                else:
+                    to_fit[s] = ser
 
-            if "Holt-Winters" in modelos_sel and _HAS_SM:
+        if to_fit and _fit_pool() is None:
+            for s, ser in to_fit.items():
                 try:
-                    yhat = _holt_winters(ser, 12)
-                    series_ol *= yhat.hvplot.line(color=color, line_dash='dotdash', alpha=0.95, label=f"{s} — Holt-Winters")
+                    hw_fits[s] = _holt_winters(ser, 12, sel.store.version)
                 except Exception:
                     pass
+            to_fit = {}
 
-            series_ol = series_ol.opts(
-                ylabel="Valor", yticks=6, yformatter=NumeralTickFormatter(format="0,0"),
-                show_legend=True, legend_position='top_left'
-            )
-            overlays.append(series_ol)
+        # Motor NumPy: todas las series en un solo ajuste vectorizado (rápido, síncrono)
+        np_fits = {}
+        if "Holt-Winters (NumPy)" in modelos_sel:
+            np_fits = _holt_winters_numpy(x, series_sel, 12, sel.store.version)
 
-        if not overlays:
-            return pn.pane.Markdown("**No hay datos modelables para las series seleccionadas.**")
+        # Real + modelos baratos de inmediato
+        layout = _show(x, present, modelos_sel, hw_fits, np_fits, lstm_fit, list(to_fit))
+        if layout is not None:
+            yield layout
+        if not to_fit:
+            return
 
-        chart = hv.Overlay(overlays)
-        return pn.Column(_right_header("6) Real vs Predicho"), model_w, pn.pane.HoloViews(chart, width=1000, height=400, sizing_mode='fixed'))
+        # Panel cancela esta tarea si llega un nuevo evento -> se cancelan los ajustes.
+        # Con la misma estructura, los ajustes llegan como un parche de datos.
+        hw_fits.update(await _holt_winters_many(to_fit, 12, sel.store.version))
+        layout = _show(x, present, modelos_sel, hw_fits, np_fits, lstm_fit, [])
+        if layout is not None:
+            yield layout
 
     return pn.Column(_view)
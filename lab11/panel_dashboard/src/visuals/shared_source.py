@@ -0,0 +1,112 @@
+# src/visuals/shared_source.py
+"""
+Líneas + puntos de varias series sobre UNA sola ColumnDataSource.
+
+Con hvplot/HoloViews cada Curve y cada Scatter lleva su propia fuente
+(fecha + su columna), así que k series viajan como 2k fuentes y 2k copias
+de `fecha`. Aquí la figura Bokeh se arma a mano: una fuente con `fecha` y
+solo las columnas seleccionadas, y por serie un glyph de línea y uno de
+marcadores que leen de ella. Con series largas la fuente lleva una versión
+reducida (src/downsample.py) que se recalcula al hacer zoom (RangesUpdate).
+Misma interfaz que PatchablePlot:
+
+    chart = SharedSourceLines()
+    if chart.show(key, sub):          # misma estructura: solo source.data
+        raise Skip
+    fig = chart.figure(cols, _style_for, ylabel="Valor")
+"""
+import pandas as pd
+from bokeh.events import RangesUpdate
+from bokeh.models import ColumnDataSource, HoverTool, NumeralTickFormatter
+from bokeh.plotting import figure as bk_figure
+from src.downsample import POINTS_PER_PIXEL, downsample_view
+
+_TOOLS = "pan,wheel_zoom,box_zoom,save,reset"
+
+def _columns(data: pd.DataFrame) -> dict:
+    return {c: data[c].to_numpy() for c in data.columns}
+
+class SharedSourceLines:
+    """Figura Bokeh persistente con una fuente compartida por todas sus series."""
+
+    def __init__(self, width: int = 1000):
+        self.width = width
+        self.key = None
+        self.source = None
+        self.frame = None       # datos completos; la fuente puede llevar una versión reducida
+        self._x_range = None    # ventana visible tras un zoom (x0, x1)
+
+    @property
+    def _points(self) -> int:
+        return POINTS_PER_PIXEL * self.width
+
+    def _sample(self) -> dict:
+        return _columns(downsample_view(self.frame, self._points, *(self._x_range or (None, None))))
+
+    def show(self, key, data: pd.DataFrame) -> bool:
+        """True si bastó con reemplazar los datos de la fuente vigente."""
+        self.frame, self._x_range = data, None
+        if self.source is not None and key == self.key:
+            self.source.data = self._sample()
+            return True
+        self.key = key
+        self.source = ColumnDataSource(self._sample())
+        return False
+
+    def append(self, rows: pd.DataFrame) -> None:
+        """Agrega filas al final (ColumnsStreamed: solo el delta viaja)."""
+        if rows.empty:
+            return
+        self.frame = pd.concat([self.frame, rows], ignore_index=True)
+        if len(self.frame) <= self._points:
+            self.source.stream(_columns(rows))
+        else:
+            self.source.data = self._sample()
+
+    def _on_ranges(self, event) -> None:
+        # Zoom/pan terminado: más resolución en la ventana visible
+        self._x_range = (event.x0, event.x1)
+        if self.frame is not None and len(self.frame) > self._points:
+            self.source.data = self._sample()
+
+    @property
+    def data(self) -> pd.DataFrame | None:
+        return self.frame
+
+    def reset(self) -> None:
+        self.key = None
+        self.source = None
+        self.frame = None
+        self._x_range = None
+
+    def figure(self, cols, style_for, ylabel: str, height: int = 400):
+        """Figura con línea (color/dash de style_for) + marcadores por columna."""
+        fig = bk_figure(width=self.width, height=height, x_axis_type="datetime", tools=_TOOLS,
+                        toolbar_location="right")
+        lines = []
+        for col in cols:
+            color, dash = style_for(col)
+            lines.append(fig.line("fecha", col, source=self.source, color=color, line_dash=dash,
+                                  line_width=2, legend_label=col, name=col))
+            fig.scatter("fecha", col, source=self.source, color=color, size=4, alpha=0.85)
+
+        fig.add_tools(HoverTool(
+            renderers=lines, mode="vline", point_policy="snap_to_data",
+            tooltips=[("serie", "$name"), ("fecha", "@fecha{%F}"), ("valor", "$y{0,0}")],
+            formatters={"@fecha": "datetime"},
+        ))
+        fig.yaxis.axis_label = ylabel
+        fig.yaxis.formatter = NumeralTickFormatter(format="0,0")
+        fig.yaxis.ticker.desired_num_ticks = 6
+        fig.xaxis.axis_label = "fecha"
+
+        lg = fig.legend[0]
+        lg.location = "top_left"
+        lg.title = "Variable"
+        lg.background_fill_alpha = 0.85
+        lg.border_line_color = "lightgray"
+        lg.spacing = 2
+        lg.label_text_font_size = "10pt"
+        lg.title_text_font_style = "bold"
+        fig.on_event(RangesUpdate, self._on_ranges)
+        return fig
@@ -1,11 +1,26 @@
 # src/visuals/tabla.py
 import panel as pn
-from src.metrics import dummy_metrics_table
+from src.artifacts import load_artifact
+from src.backtest import get_backtest
+from src.metrics import backtest_metrics_table
 
-def metrics_table_view(df, series_w, range_w):
-    @pn.depends(series_w.param.value, range_w.param.value_throttled)
-    def _make(series_sel, drange):
-        data = dummy_metrics_table(series_sel if series_sel else df.columns)
-        return pn.widgets.Tabulator(data, pagination='local', page_size=10, height=300)
+def metrics_table_view(sel):
+    # Un solo Tabulator por sesión: cada cambio solo parchea su `value`
+    table = pn.widgets.Tabulator(pagination='local', page_size=10, height=300)
 
-    return pn.Column(pn.pane.Markdown("### 8) Tabla comparativa de métricas (placeholder)"), _make)
+    @pn.depends(sel.param.frame, watch=True)
+    def _update(_frame):
+        series = sel.series if sel.series else sel.store.df.columns
+        # Historia completa con artefacto precalculado: métricas ya reducidas
+        art = load_artifact(sel.store.version)
+        if art is not None and tuple(sel.bounds) == (0, len(sel.store.fechas)):
+            table.value = art.metrics_table(series)
+            return
+        # Backtest de origen móvil: se calcula una vez por versión de datos
+        bt = get_backtest(sel.store)
+        table.value = backtest_metrics_table(bt, series, sel.start, sel.end)
+
+    # on_init solo aplica a métodos de Parameterized: la primera carga va explícita
+    _update(sel.frame)
+
+    return pn.Column(pn.pane.Markdown("### 8) Tabla comparativa de métricas (backtest, origen móvil h=1..12)"), table)
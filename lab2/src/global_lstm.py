@@ -0,0 +1,238 @@
+# src/global_lstm.py
+"""
+Un solo LSTM global para todas las series (en lugar de un modelo por serie).
+
+- Escalado min-max por serie, ajustado solo con su tramo de entrenamiento.
+- Cada paso de la ventana lleva el valor escalado + one-hot de la serie,
+  así el modelo comparte pesos pero distingue productos.
+- Ventanas de windowing.WindowDataset en lotes grandes (streaming con
+  tf.data), hilos intra/inter-op de TensorFlow configurados explícitamente.
+- Se registra el throughput (ventanas/s) de cada época.
+
+Agregar series solo agrega ventanas al mismo fit, no un entrenamiento más.
+
+    cd lab2/src && python global_lstm.py --epochs 100 --batch 512 --threads 4 \
+        --export ../../lab11/panel_dashboard/models/lstm_global.npz   # pesos para el dashboard
+
+TensorFlow se importa dentro de las funciones que lo usan: la preparación de
+datos no lo necesita.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from windowing import SERIES, WindowDataset
+
+DATA_CSV = Path(__file__).resolve().parents[1] / "data" / "clean" / "Series_de_Tiempo_Combustibles.csv"
+
+def mask_zeros(df: pd.DataFrame) -> pd.DataFrame:
+    """Los meses en cero (p.ej. Diesel_Con desde 2017) pasan a NaN: no son datos."""
+    return df.where(df > 0)
+
+def load_series(path=DATA_CSV, series=SERIES) -> pd.DataFrame:
+    """Frame mensual fechas x series, con los ceros como NaN (mask_zeros)."""
+    df = pd.read_csv(path, parse_dates=["fecha"]).sort_values("fecha").set_index("fecha")
+    return mask_zeros(df[list(series)].astype("float64"))
+
+def train_cutoffs(df: pd.DataFrame, train_ratio: float = 0.8) -> np.ndarray:
+    """Fila de corte por serie: el 80% inicial de sus observaciones válidas es entrenamiento."""
+    valid = df.notna().to_numpy()
+    first = valid.argmax(axis=0)
+    return first + (valid.sum(axis=0) * train_ratio).astype(np.int64)
+
+class SeriesScaler:
+    """Min-max por columna (serie), como un MinMaxScaler por serie pero en un solo arreglo."""
+
+    def fit(self, values: np.ndarray, cutoffs: np.ndarray) -> "SeriesScaler":
+        rows = np.arange(len(values))[:, None] < cutoffs[None, :]
+        train = np.where(rows, values, np.nan)
+        self.min_ = np.nanmin(train, axis=0)
+        self.scale_ = np.nanmax(train, axis=0) - self.min_
+        self.scale_[~(self.scale_ > 0)] = 1.0
+        return self
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        return (values - self.min_) / self.scale_
+
+    def inverse(self, scaled: np.ndarray, series_ids: np.ndarray) -> np.ndarray:
+        """Regresa a escala original; `scaled` (b, ...) y `series_ids` (b,)."""
+        shape = (-1,) + (1,) * (np.ndim(scaled) - 1)
+        return scaled * self.scale_[series_ids].reshape(shape) + self.min_[series_ids].reshape(shape)
+
+def with_series_ids(X: np.ndarray, ids: np.ndarray, n_series: int) -> np.ndarray:
+    """(b, window, 1) -> (b, window, 1 + n_series): valor + one-hot de la serie en cada paso."""
+    onehot = np.zeros((len(ids), X.shape[1], n_series), dtype=X.dtype)
+    onehot[np.arange(len(ids)), :, ids] = 1.0
+    return np.concatenate([X, onehot], axis=2)
+
+class GlobalWindows:
+    """Ventanas escaladas de todas las series con su partición train/test por serie."""
+
+    def __init__(self, df: pd.DataFrame, window: int = 12, horizon: int = 1, train_ratio: float = 0.8):
+        self.series = list(df.columns)
+        self.window, self.horizon = window, horizon
+        values = df.to_numpy(dtype="float64")
+        cutoffs = train_cutoffs(df, train_ratio)
+        self.scaler = SeriesScaler().fit(values, cutoffs)
+        self.ds = WindowDataset(self.scaler.transform(values), window, horizon)
+        # Train: ventana y objetivo antes del corte. Test: objetivo desde el corte.
+        end = self.ds.starts + window + horizon
+        cut = cutoffs[self.ds.series_ids]
+        self.train_idx = np.flatnonzero(end <= cut)
+        self.test_idx = np.flatnonzero(self.ds.starts + window >= cut)
+
+    @property
+    def n_features(self) -> int:
+        return 1 + len(self.series)
+
+    def take(self, idx) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        X, y, s = self.ds.take(idx)
+        return with_series_ids(X, s, len(self.series)), y, s
+
+    def batches(self, idx: np.ndarray, batch_size: int, shuffle: bool = True, seed: int | None = None):
+        order = np.random.default_rng(seed).permutation(idx) if shuffle else idx
+        for i in range(0, len(order), batch_size):
+            X, y, _ = self.take(order[i:i + batch_size])
+            yield X, y
+
+    def tf_dataset(self, idx: np.ndarray, batch_size: int, shuffle: bool = True):
+        import tensorflow as tf
+        spec = (tf.TensorSpec((None, self.window, self.n_features), tf.float32),
+                tf.TensorSpec((None, self.horizon), tf.float32))
+        return tf.data.Dataset.from_generator(
+            lambda: self.batches(idx, batch_size, shuffle), output_signature=spec
+        ).prefetch(tf.data.AUTOTUNE)
+
+def configure_threads(intra: int | None = None, inter: int | None = None) -> None:
+    """Hilos de TensorFlow en CPU; hay que llamarlo antes de crear cualquier tensor."""
+    import tensorflow as tf
+    intra = intra or os.cpu_count() or 1
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter or max(1, min(2, intra // 2)))
+
+def build_model(window: int, n_features: int, horizon: int = 1, units: int = 64, lr: float = 1e-3,
+                units2: int = 0, dropout: float = 0.0):
+    """
+    LSTM(units) -> Dense(horizon) sobre ventanas (window, 1 + n_series). Con
+    units2 > 0 es la variante apilada del notebook: LSTM -> Dropout -> LSTM(units2).
+    """
+    from tensorflow.keras import Input, Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.optimizers import Adam
+    layers = [Input((window, n_features)), LSTM(units, activation="tanh", return_sequences=units2 > 0)]
+    if units2:
+        layers += [Dropout(dropout), LSTM(units2, activation="tanh")]
+    elif dropout:
+        layers.append(Dropout(dropout))
+    model = Sequential(layers + [Dense(horizon)])
+    model.compile(optimizer=Adam(learning_rate=lr), loss="mse")
+    return model
+
+def _throughput_callback(n_windows: int, log: list):
+    from tensorflow.keras.callbacks import Callback
+
+    class _Throughput(Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            dt = time.perf_counter() - self._t0
+            log.append({"epoch": epoch + 1, "seconds": dt, "windows_per_s": n_windows / dt})
+
+    return _Throughput()
+
+def evaluate(model, data: GlobalWindows, idx: np.ndarray, batch_size: int = 4096) -> pd.DataFrame:
+    """MAE/RMSE por serie en escala original sobre las ventanas `idx`."""
+    X, y, s = data.take(idx)
+    pred = model.predict(X, batch_size=batch_size, verbose=0)
+    err = data.scaler.inverse(pred, s) - data.scaler.inverse(y, s)
+    rows = []
+    for i, name in enumerate(data.series):
+        e = err[s == i]
+        if len(e):
+            rows.append({"serie": name, "n": len(e), "MAE": float(np.abs(e).mean()),
+                         "RMSE": float(np.sqrt((e ** 2).mean()))})
+    return pd.DataFrame(rows)
+
+def train_global(df: pd.DataFrame, window: int = 12, horizon: int = 1, units: int = 64, lr: float = 1e-3,
+                 epochs: int = 100, batch_size: int = 512, patience: int = 20, verbose: int = 0) -> dict:
+    """
+    Entrena el LSTM global y devuelve {model, data, history, throughput, metrics}.
+    `throughput` tiene segundos y ventanas/s por época; `metrics`, MAE/RMSE de test por serie.
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+    data = GlobalWindows(df, window, horizon)
+    model = build_model(window, data.n_features, horizon, units, lr)
+    throughput = []
+    callbacks = [_throughput_callback(len(data.train_idx), throughput)]
+    if len(data.test_idx):
+        callbacks.append(EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True))
+    history = model.fit(
+        data.tf_dataset(data.train_idx, batch_size),
+        validation_data=data.tf_dataset(data.test_idx, batch_size, shuffle=False) if len(data.test_idx) else None,
+        epochs=epochs, callbacks=callbacks, verbose=verbose,
+    )
+    return {"model": model, "data": data, "history": history.history,
+            "throughput": pd.DataFrame(throughput), "metrics": evaluate(model, data, data.test_idx)}
+
+def export_npz(model, data: GlobalWindows, path) -> None:
+    """
+    Pesos LSTM/Dense + escalado por serie en un .npz compacto (float32) para
+    la inferencia NumPy del dashboard (lab11/panel_dashboard/src/lstm_numpy.py).
+    Keras guarda las compuertas del LSTM en orden i, f, c, o; Dropout no
+    tiene pesos y en inferencia es la identidad. `zero_as_nan` le indica al
+    dashboard que aplique mask_zeros antes de escalar, como load_series.
+    """
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    arrays, n_lstm = {}, 0
+    for layer in model.layers:
+        if isinstance(layer, LSTM):
+            if layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid":
+                raise ValueError(f"{layer.name}: solo se exportan LSTM tanh/sigmoid")
+            kernel, recurrent, bias = layer.get_weights()
+            arrays.update({f"lstm{n_lstm}_kernel": kernel, f"lstm{n_lstm}_recurrent": recurrent,
+                           f"lstm{n_lstm}_bias": bias})
+            n_lstm += 1
+        elif isinstance(layer, Dense):
+            arrays["dense_kernel"], arrays["dense_bias"] = layer.get_weights()
+        elif not isinstance(layer, Dropout):
+            raise ValueError(f"{layer.name}: capa no soportada por el kernel NumPy")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)   # p.ej. panel_dashboard/models/ aún no existe
+    np.savez_compressed(
+        path, **{k: v.astype("float32") for k, v in arrays.items()},
+        n_lstm=np.int64(n_lstm), window=np.int64(data.window), horizon=np.int64(data.horizon),
+        series=np.array(data.series), scale_min=data.scaler.min_, scale_scale=data.scaler.scale_,
+        zero_as_nan=np.bool_(True),
+    )
+
+def main():
+    ap = argparse.ArgumentParser(description="LSTM global multi-serie")
+    ap.add_argument("--window", type=int, default=12)
+    ap.add_argument("--horizon", type=int, default=1)
+    ap.add_argument("--units", type=int, default=64)
+    ap.add_argument("--epochs", type=int, default=100)
+    ap.add_argument("--batch", type=int, default=512)
+    ap.add_argument("--threads", type=int, default=None, help="hilos intra-op (default: todos los núcleos)")
+    ap.add_argument("--out", default=None, help="ruta .keras donde guardar el modelo")
+    ap.add_argument("--export", default=None, help="ruta .npz con los pesos para el dashboard")
+    args = ap.parse_args()
+
+    configure_threads(args.threads)
+    df = load_series()
+    res = train_global(df, args.window, args.horizon, args.units, epochs=args.epochs, batch_size=args.batch)
+    tp = res["throughput"]
+    print(f"series: {len(df.columns)}  ventanas train: {len(res['data'].train_idx)}  "
+          f"test: {len(res['data'].test_idx)}  épocas: {len(tp)}")
+    print(f"throughput: {tp['windows_per_s'].median():,.0f} ventanas/s (mediana), "
+          f"{tp['seconds'].sum():.1f} s en total")
+    print(res["metrics"].to_string(index=False))
+    if args.out:
+        res["model"].save(args.out)
+    if args.export:
+        export_npz(res["model"], res["data"], args.export)
+
+if __name__ == "__main__":
+    main()
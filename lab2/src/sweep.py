@@ -0,0 +1,162 @@
+# src/sweep.py
+"""
+Búsqueda de hiperparámetros del LSTM global en paralelo (solo CPU).
+
+Las configuraciones (unidades, segunda capa, dropout, learning rate,
+ventana) se entrenan a la vez en un pool de procesos; cada worker fija sus
+hilos de TensorFlow (núcleos / workers) para no sobresuscribir la CPU.
+Successive halving: todas arrancan con pocas épocas y en cada ronda solo el
+mejor 1/eta sigue, con eta veces más épocas, retomando su checkpoint.
+
+Cada (configuración, ronda) se agrega a una tabla CSV local:
+
+    cd lab2/src && python sweep.py --workers 4 --min-epochs 10 --max-epochs 270
+    # -> ../results/sweep.csv y ../results/sweep_runs/<trial>.keras
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+import pandas as pd
+
+RESULTS_DIR = Path(__file__).resolve().parents[1] / "results"
+
+# Espacio de búsqueda: lo que el notebook probaba a mano celda por celda
+GRID = {
+    "units": [32, 64, 96],
+    "units2": [0, 32],
+    "dropout": [0.0, 0.2],
+    "lr": [9.5e-4, 1e-3, 3e-3],
+    "window": [12, 24],
+}
+
+def grid_configs(grid: dict = GRID) -> list[dict]:
+    """Producto cartesiano del grid; dropout sin segunda capa se descarta salvo 0."""
+    keys = list(grid)
+    configs = [dict(zip(keys, vals)) for vals in itertools.product(*grid.values())]
+    return [c for c in configs if c["units2"] or not c["dropout"]]
+
+def trial_id(cfg: dict) -> str:
+    return "_".join(f"{k}{v}" for k, v in cfg.items())
+
+# ---------- worker ----------
+_WINDOWS = {}
+
+def _init_worker(threads: int) -> None:
+    # Antes de importar TensorFlow: hilos fijos por proceso
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    from global_lstm import configure_threads
+    configure_threads(threads, 1)
+
+def _run_trial(cfg: dict, epochs: int, initial_epoch: int, ckpt: str, batch_size: int, patience: int) -> dict:
+    """Entrena (o retoma) una configuración hasta `epochs` y devuelve su mejor val_loss."""
+    from tensorflow.keras.callbacks import EarlyStopping
+    from tensorflow.keras.models import load_model
+    from global_lstm import GlobalWindows, build_model, load_series
+
+    if cfg["window"] not in _WINDOWS:
+        _WINDOWS[cfg["window"]] = GlobalWindows(load_series(), cfg["window"])
+    data = _WINDOWS[cfg["window"]]
+    if initial_epoch and os.path.exists(ckpt):
+        model = load_model(ckpt)
+    else:
+        model = build_model(cfg["window"], data.n_features, units=cfg["units"], lr=cfg["lr"],
+                            units2=cfg["units2"], dropout=cfg["dropout"])
+        initial_epoch = 0
+
+    t0 = time.perf_counter()
+    hist = model.fit(
+        data.tf_dataset(data.train_idx, batch_size),
+        validation_data=data.tf_dataset(data.test_idx, batch_size, shuffle=False),
+        epochs=epochs, initial_epoch=initial_epoch, verbose=0,
+        callbacks=[EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True)],
+    ).history
+    seconds = time.perf_counter() - t0
+    model.save(ckpt)
+    ran = len(hist["loss"])
+    return {
+        "trial": trial_id(cfg), **cfg, "epochs": initial_epoch + ran, "val_loss": float(min(hist["val_loss"])),
+        "loss": float(hist["loss"][-1]), "seconds": seconds,
+        "windows_per_s": ran * len(data.train_idx) / seconds if seconds else float("nan"),
+        # EarlyStopping cortó antes del presupuesto: no vale la pena retomarla
+        "stopped": initial_epoch + ran < epochs,
+    }
+
+# ---------- successive halving ----------
+def successive_halving(configs: list[dict], run_rung, min_epochs: int = 10, max_epochs: int = 270,
+                       eta: int = 3) -> pd.DataFrame:
+    """
+    Rondas con presupuesto min_epochs·eta^k (tope max_epochs). `run_rung(jobs)`
+    recibe [(cfg, epochs, initial_epoch)] y devuelve un dict de resultados por job.
+    """
+    alive = list(configs)
+    done = {}          # trial -> épocas ya entrenadas
+    rows = []
+    budget, rung = min_epochs, 0
+    while alive:
+        jobs = [(cfg, budget, done.get(trial_id(cfg), 0)) for cfg in alive]
+        results = run_rung(jobs)
+        for r in results:
+            r["rung"] = rung
+            done[r["trial"]] = r["epochs"]
+        rows.extend(results)
+        if budget >= max_epochs or len(alive) == 1:
+            break
+        ranked = sorted(results, key=lambda r: r["val_loss"])
+        keep = {r["trial"] for r in ranked[:max(1, len(ranked) // eta)] if not r["stopped"]}
+        alive = [cfg for cfg in alive if trial_id(cfg) in keep]
+        budget, rung = min(budget * eta, max_epochs), rung + 1
+    return pd.DataFrame(rows)
+
+def run_sweep(configs: list[dict], workers: int = 4, min_epochs: int = 10, max_epochs: int = 270, eta: int = 3,
+              batch_size: int = 512, patience: int = 20, out: Path = RESULTS_DIR / "sweep.csv") -> pd.DataFrame:
+    """Successive halving con un pool de `workers` procesos; la tabla se reescribe tras cada ronda."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    runs = out.parent / "sweep_runs"
+    runs.mkdir(parents=True, exist_ok=True)
+    table = []
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        def run_rung(jobs):
+            futures = [pool.submit(_run_trial, cfg, epochs, start, str(runs / f"{trial_id(cfg)}.keras"),
+                                   batch_size, patience) for cfg, epochs, start in jobs]
+            results = [f.result() for f in futures]
+            table.extend(results)
+            pd.DataFrame(table).to_csv(out, index=False)
+            best = min(results, key=lambda r: r["val_loss"])
+            print(f"[sweep] {len(jobs)} configs a {jobs[0][1]} épocas; mejor {best['trial']} "
+                  f"val_loss={best['val_loss']:.5f}")
+            return results
+
+        results = successive_halving(configs, run_rung, min_epochs, max_epochs, eta)
+    results.to_csv(out, index=False)
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep de hiperparámetros del LSTM global")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--min-epochs", type=int, default=10)
+    ap.add_argument("--max-epochs", type=int, default=270)
+    ap.add_argument("--eta", type=int, default=3)
+    ap.add_argument("--batch", type=int, default=512)
+    ap.add_argument("--patience", type=int, default=20)
+    ap.add_argument("--out", type=Path, default=RESULTS_DIR / "sweep.csv")
+    args = ap.parse_args()
+
+    configs = grid_configs()
+    print(f"[sweep] {len(configs)} configuraciones, {args.workers} workers x "
+          f"{max(1, (os.cpu_count() or 1) // args.workers)} hilos")
+    res = run_sweep(configs, args.workers, args.min_epochs, args.max_epochs, args.eta,
+                    args.batch, args.patience, args.out)
+    final = res.sort_values(["rung", "val_loss"], ascending=[False, True])
+    print(final.head(10).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
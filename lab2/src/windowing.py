@@ -0,0 +1,100 @@
+# src/windowing.py
+"""
+Ventanas deslizantes para los modelos LSTM, sin copiar datos.
+
+`sliding_windows` arma las ventanas con numpy.lib.stride_tricks.sliding_window_view:
+X e y son vistas (solo lectura) sobre el mismo arreglo, para cualquier
+ventana y horizonte, y para una o varias series a la vez.
+
+    from windowing import create_sequences, WindowDataset, SERIES
+
+    X, y = create_sequences(train_data, 12)             # reemplazo directo del notebook
+    ds = WindowDataset(df[SERIES], window=12, horizon=1)
+    for xb, yb in ds.batches(256, shuffle=True):         # solo se materializa cada lote
+        ...
+    tf_ds = ds.to_tf_dataset(256)                        # modo streaming para Keras
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+SERIES = ["Regular_Imp", "Superior_Imp", "Diesel_Imp", "Regular_Con", "Superior_Con", "Diesel_Con"]
+
+def sliding_windows(data, window: int, horizon: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Ventanas (T x k) -> X: (n, window, k) e y: (n, horizon, k), con
+    n = T - window - horizon + 1. Ambas son vistas sobre `data`, no copias.
+    """
+    a = np.asarray(data)
+    if a.ndim == 1:
+        a = a[:, None]
+    n = len(a) - window - horizon + 1
+    if n <= 0:
+        k = a.shape[1]
+        return np.empty((0, window, k), dtype=a.dtype), np.empty((0, horizon, k), dtype=a.dtype)
+    # sliding_window_view deja la ventana en el último eje: (n, k, window) -> (n, window, k)
+    X = sliding_window_view(a, window, axis=0)[:n].transpose(0, 2, 1)
+    y = sliding_window_view(a[window:], horizon, axis=0)[:n].transpose(0, 2, 1)
+    return X, y
+
+def create_sequences(data, window_size: int = 12) -> tuple[np.ndarray, np.ndarray]:
+    """Mismo contrato que la versión del notebook: X (n, window, k), y (n, k) el paso siguiente."""
+    X, y = sliding_windows(data, window_size, 1)
+    return X, y[:, 0, :]
+
+def valid_windows(values: np.ndarray, window: int, horizon: int = 1) -> np.ndarray:
+    """Máscara (n, k): True si la ventana + horizonte de la serie no tiene NaN."""
+    bad = np.zeros((len(values) + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(np.isnan(values), axis=0, out=bad[1:])
+    span = window + horizon
+    n = max(len(values) - span + 1, 0)
+    return (bad[span:span + n] - bad[:n]) == 0
+
+class WindowDataset:
+    """
+    Ventanas de todas las series de un frame (fechas x series) a la vez.
+
+    Las series tienen tramos válidos distintos (p.ej. *_Imp empieza después
+    que *_Con), así que cada muestra es un par (inicio, serie) con la
+    ventana y el horizonte completos. Nada se copia hasta que se pide un
+    lote: `batches` y `to_tf_dataset` materializan solo `batch_size` ventanas.
+    """
+
+    def __init__(self, data: pd.DataFrame | np.ndarray, window: int = 12, horizon: int = 1):
+        self.series = list(data.columns) if isinstance(data, pd.DataFrame) else None
+        self.values = np.ascontiguousarray(np.asarray(data, dtype="float32"))
+        if self.values.ndim == 1:
+            self.values = self.values[:, None]
+        self.window, self.horizon = window, horizon
+        self.X, self.y = sliding_windows(self.values, window, horizon)
+        self.starts, self.series_ids = np.nonzero(valid_windows(self.values, window, horizon))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def take(self, idx) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(X (b, window, 1), y (b, horizon), id de serie (b,)) para las muestras `idx`."""
+        t, s = self.starts[idx], self.series_ids[idx]
+        return self.X[t, :, s][..., None], self.y[t, :, s], s
+
+    def arrays(self, with_ids: bool = False):
+        """Todas las ventanas válidas materializadas (solo para historias cortas)."""
+        X, y, s = self.take(np.arange(len(self)))
+        return (X, y, s) if with_ids else (X, y)
+
+    def batches(self, batch_size: int = 256, shuffle: bool = False, seed: int | None = None,
+                with_ids: bool = False):
+        """Generador de lotes; cada lote es la única copia que se crea."""
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for i in range(0, len(order), batch_size):
+            X, y, s = self.take(order[i:i + batch_size])
+            yield (X, y, s) if with_ids else (X, y)
+
+    def to_tf_dataset(self, batch_size: int = 256, shuffle: bool = True, seed: int | None = None):
+        """tf.data.Dataset alimentado por `batches` (TensorFlow se importa aquí)."""
+        import tensorflow as tf
+        spec = (tf.TensorSpec((None, self.window, 1), tf.float32),
+                tf.TensorSpec((None, self.horizon), tf.float32))
+        return tf.data.Dataset.from_generator(
+            lambda: self.batches(batch_size, shuffle=shuffle, seed=seed), output_signature=spec
+        ).prefetch(tf.data.AUTOTUNE)